@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""Diagram representations of Markov compacta"""
+
+from .instrument import span, count, instrumented, MemorySink, JSONLinesSink, ProfileSink
+from .maps import Map, middle, edge_array, position_array, anchor_array
+from .templates import ProductionTemplate, GluingTemplate
+from .decomposition import Decomposition
+from .connectivity import UnionFind, ConnectivityTracker
+from .assembly import BatchAssembler, ElementaryAssembler
+from .layout import layout_scores
+from .diagram import Definition, Production, Gluing, MarkovDiagram, ElementaryMarkovDiagram
+from .checkpoint import Checkpoint
+from .sequence import MarkovSequence
+from .diagrams import DIAGRAMS, get_diagram
+from .plan import plan
+from .zoom import zoom
+from .homology import betti_number, induced_rank, cycle_ranks
+from .tiles import export_pyramid
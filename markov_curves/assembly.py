@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""Bulk assembly of elementary Markov diagrams"""
+
+import numpy as np
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from .connectivity import ConnectivityTracker
+from .decomposition import Decomposition
+from .instrument import count
+
+class ElementaryAssembler(object):
+	"""Assembles upper graphs of an elementary Markov diagram in bulk.
+
+	Each vertex of the bottom graph is replaced by a copy of the vertex production ("V") and each edge by a
+	copy of the edge production ("E"). Upper vertices are numbered as in Decomposition.assemble: copy of "V"
+	over bottom vertex i occupies indices i * nv, ..., (i + 1) * nv - 1 and new vertices of copies of "E" follow
+	in bottom edge order. Gluings of the ends ("L" and "R") become column remaps of the edge chart."""
+
+	def __init__(self, cls):
+		self.cls = cls
+
+		V = cls.get_vertex_production().get_template()
+		self.v_size = V.top_size
+		self.v_edges = V.edges
+		self.v_relpos = V.relpos
+
+		if V.bottom_size != 1 or np.any(V.mid) or np.any(V.bonding != 0):
+			raise ValueError("Vertex production of an elementary diagram has to map onto a single vertex")
+
+		self.pool = None
+		self.pool_size = None
+		if cls.get_edge_production() is None:
+			self.e_edges = None
+			self.e_side = np.zeros(0, dtype=np.int64)
+			self.classify_edges()
+			return
+		E = cls.get_edge_production().get_template()
+
+		# Resolve top gluings: column k of the edge chart is a copy of column e_source[k] of the vertex chart of
+		# the left (e_side[k] == 0) or right (e_side[k] == 1) end, or a new vertex (e_side[k] == -1)
+		self.e_side = np.full(E.top_size, -1, dtype=np.int64)
+		self.e_source = np.full(E.top_size, -1, dtype=np.int64)
+		bottom_side = np.full(E.bottom_size, -1, dtype=np.int64)
+		for side, key in enumerate([cls.left_key, cls.right_key]):
+			glue = cls.get_gluings()[key].get_template()
+			self.e_side[glue.top] = side
+			self.e_source[glue.top] = np.arange(self.v_size)
+			bottom_side[glue.bottom[0]] = side
+
+		self.e_new = np.flatnonzero(self.e_side < 0)
+		self.e_edges = E.edges
+		self.e_relpos = E.relpos[self.e_new]
+
+		# Bonding map of new vertices, as sides of the bottom edge
+		self.e_bonding = bottom_side[E.bonding[self.e_new]] if len(self.e_new) else np.zeros((0, 2), dtype=np.int64)
+		self.e_mid = E.mid[self.e_new]
+		if np.any(self.e_bonding < 0):
+			raise ValueError("Edge production maps a new vertex outside of the glued bottom vertices")
+		self.classify_edges()
+
+	def classify_edges(self):
+		"""Template edges that are stamped: the first of every undirected pair of "V" (v_stamped) and of "E"
+		(e_stamped), without edges of "E" that are copies of edges of "V". An edge of "E" between two vertices
+		glued from the same side that is not in "V" is shared by the copies of "E" over all bottom edges at
+		that bottom vertex: e_shared holds the columns of such edges in e_stamped with the sides of their
+		bottom vertex and ids of their pairs of vertex chart columns, to be deduplicated after stamping."""
+		self.v_stamped = first_pairs(self.v_edges)
+		v_pairs = set((min(s, t), max(s, t)) for s, t in self.v_stamped.tolist())
+		if self.e_edges is None:
+			return
+
+		def end(x):
+			return (int(self.e_side[x]), int(self.e_source[x])) if self.e_side[x] >= 0 else (-1, int(x))
+
+		stamped, shared, pairs, seen = [], [], {}, set()
+		for s, t in self.e_edges.tolist():
+			key = (min(end(s), end(t)), max(end(s), end(t)))
+			if key in seen:
+				continue
+			seen.add(key)
+			if self.e_side[s] >= 0 and self.e_side[s] == self.e_side[t]:
+				pair = (min(self.e_source[s], self.e_source[t]), max(self.e_source[s], self.e_source[t]))
+				if pair in v_pairs:
+					continue
+				shared.append((len(stamped), self.e_side[s], pairs.setdefault(pair, len(pairs))))
+			stamped.append((s, t))
+		self.e_stamped = np.array(stamped, dtype=np.int64).reshape(-1, 2)
+		self.e_shared = np.array(shared, dtype=np.int64).reshape(-1, 3)
+		self.e_shared_pairs = len(pairs)
+
+	def sizes(self, nb, ne):
+		"""Number of upper vertices and of stamped upper edges over a bottom graph with nb vertices and ne edges
+		(before deduplication of shared edges)"""
+		if self.e_edges is None:
+			return nb * self.v_size, nb * len(self.v_stamped)
+		return nb * self.v_size + ne * len(self.e_new), nb * len(self.v_stamped) + ne * len(self.e_stamped)
+
+	def stamp_vertices(self, out, first, last):
+		"""Copies of "V" over bottom vertices first, ..., last - 1, written to their rows of the output arrays
+		(vertex chart, relative positions, bonding map and edges)"""
+		nv, mv = self.v_size, len(self.v_stamped)
+		chart = np.arange(first * nv, last * nv, dtype=np.int64).reshape(-1, nv)
+		out["vertex_chart"][first:last] = chart
+		out["relpos"][first * nv:last * nv] = np.tile(self.v_relpos, (last - first, 1))
+		f = np.repeat(np.arange(first, last, dtype=np.int64), nv)
+		out["f"][first * nv:last * nv, 0] = f
+		out["f"][first * nv:last * nv, 1] = f
+		out["mid"][first * nv:last * nv] = False
+		if mv:
+			edges = out["edges"][first * mv:last * mv].reshape(-1, mv, 2)
+			edges[:, :, 0] = chart[:, self.v_stamped[:, 0]]
+			edges[:, :, 1] = chart[:, self.v_stamped[:, 1]]
+
+	def stamp_edges(self, out, nb, first, last):
+		"""Copies of "E" over bottom edges first, ..., last - 1 (read from out["bottom_edges"]) of the bottom graph
+		with nb vertices, written to their rows of the output arrays. Gluings are resolved against the global
+		numbering of copies of "V", so edges between parts need no stitching"""
+		if self.e_edges is None:
+			raise ValueError("Diagram has no edge production")
+
+		nn, me = len(self.e_new), len(self.e_stamped)
+		bottom_edges = np.asarray(out["bottom_edges"][first:last])
+		chart = np.empty((last - first, len(self.e_side)), dtype=np.int64)
+		for side in [0, 1]:
+			columns = np.flatnonzero(self.e_side == side)
+			chart[:, columns] = bottom_edges[:, side, np.newaxis] * self.v_size + self.e_source[columns]
+		chart[:, self.e_new] = nb * self.v_size + np.arange(first * nn, last * nn, dtype=np.int64).reshape(last - first, nn)
+		out["edge_chart"][first:last] = chart
+
+		rows = slice(nb * self.v_size + first * nn, nb * self.v_size + last * nn)
+		out["relpos"][rows] = np.tile(self.e_relpos, (last - first, 1))
+		out["f"][rows] = bottom_edges[:, self.e_bonding].reshape(-1, 2)
+		out["mid"][rows] = np.tile(self.e_mid, last - first)
+		if me:
+			offset = nb * len(self.v_stamped)
+			edges = out["edges"][offset + first * me:offset + last * me].reshape(-1, me, 2)
+			edges[:, :, 0] = chart[:, self.e_stamped[:, 0]]
+			edges[:, :, 1] = chart[:, self.e_stamped[:, 1]]
+
+	def get_pool(self, processes):
+		"""Process pool of given size, kept for later levels"""
+		if self.pool is None or self.pool_size != processes:
+			self.close()
+			self.pool, self.pool_size = multiprocessing.Pool(processes), processes
+		return self.pool
+
+	def close(self):
+		if self.pool is not None:
+			self.pool.close()
+			self.pool.join()
+			self.pool = None
+
+	def __getstate__(self):
+		state = dict(self.__dict__)
+		state["pool"] = None
+		return state
+
+	def assemble(self, g, processes = None, connectivity = False):
+		"""Return decomposition of g with upper graph, relative positions and bonding map assembled in bulk.
+
+		Every part of the output is written in place: with processes > 1 bottom vertices and bottom edges are
+		split into balanced contiguous parts, stamped by a process pool (kept for later calls) into shared
+		memory-mapped arrays, so that nothing is sent back to this process. Edges are deduplicated by the
+		templates (classify_edges), so no global pass over all edges is needed unless the diagram has shared
+		edges (one pass over those) or the bottom graph has loops or multiple edges. The result is identical
+		to Decomposition.assemble. With connectivity=True the decomposition gets components (of the upper
+		graph) and fibre_components (per bottom vertex) from a ConnectivityTracker, fed the deduplicated
+		edges in one batch once all parts are stamped (parts are never sent back to this process)."""
+		nb = g.num_vertices()
+		bottom_edges = g.get_edges()[:, :2].astype(np.int64)
+		ne = len(bottom_edges)
+		n, stamped = self.sizes(nb, ne)
+		shapes = {
+			"relpos": ((n, 2), np.float64),
+			"f": ((n, 2), np.int64),
+			"mid": ((n,), np.bool_),
+			"edges": ((stamped, 2), np.int64),
+			"vertex_chart": ((nb, self.v_size), np.int64),
+			"edge_chart": ((ne, len(self.e_side) if self.e_edges is not None else 0), np.int64),
+			"bottom_edges": ((ne, 2), np.int64)
+		}
+
+		parts = 1 if processes is None else max(processes, 1)
+		jobs = []
+		bounds = np.linspace(0, nb, parts + 1).astype(np.int64)
+		for first, last in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+			if last > first:
+				jobs.append(("stamp_vertices", (first, last)))
+		if self.e_edges is not None:
+			bounds = np.linspace(0, ne, parts + 1).astype(np.int64)
+			for first, last in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+				if last > first:
+					jobs.append(("stamp_edges", (nb, first, last)))
+
+		if parts == 1:
+			out = dict((name, np.empty(shape, dtype=dtype)) for name, (shape, dtype) in shapes.items())
+			out["bottom_edges"] = bottom_edges
+			for method, args in jobs:
+				getattr(self, method)(out, *args)
+		else:
+			directory = tempfile.mkdtemp(prefix="markov-assembly-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+			try:
+				spec = dict((name, (os.path.join(directory, name), np.dtype(dtype).str, shape)) for name, (shape, dtype) in shapes.items())
+				out = open_buffers(spec, "w+")
+				out["bottom_edges"][:] = bottom_edges
+				self.get_pool(parts).map(stamp_job, [(self, method, args, spec) for method, args in jobs])
+			finally:
+				# Mappings stay valid after the files are removed
+				shutil.rmtree(directory, ignore_errors=True)
+			out = dict((name, np.asarray(a)) for name, a in out.items())
+
+		edges = out["edges"]
+		if ne and (np.any(bottom_edges[:, 0] == bottom_edges[:, 1]) or len(np.unique(np.minimum(bottom_edges[:, 0], bottom_edges[:, 1]) * nb + np.maximum(bottom_edges[:, 0], bottom_edges[:, 1]))) < ne):
+			# Copies of "E" over loops and multiple edges share edges: keep first occurrence of every edge
+			key = np.minimum(edges[:, 0], edges[:, 1]) * n + np.maximum(edges[:, 0], edges[:, 1])
+			edges = edges[np.sort(np.unique(key, return_index=True)[1])]
+		elif self.e_edges is not None and len(self.e_shared) and ne:
+			edges = self.drop_shared(edges, bottom_edges, nb)
+
+		count("vertices_created", n)
+		count("edges_created", len(edges))
+		count("edge_candidates", stamped)
+		count("chart_lookups_avoided", out["vertex_chart"].size + out["edge_chart"].size)
+		count("bytes_allocated", sum(out[name].nbytes for name in shapes if name != "bottom_edges"))
+
+		d = Decomposition.from_arrays(self.cls, g, edges, out["relpos"], out["f"], out["mid"])
+		d.vertex_chart = out["vertex_chart"]
+		d.edge_chart = out["edge_chart"]
+		if connectivity:
+			tracker = ConnectivityTracker(n, nb)
+			tracker.add_edges(edges, out["f"], out["mid"])
+			d.components = tracker.components()
+			d.fibre_components = tracker.fibre_components(out["f"], out["mid"])
+		return d
+
+	def drop_shared(self, edges, bottom_edges, nb):
+		"""Edges without later copies of shared edges: a shared edge over bottom vertex v is kept in the copy
+		of "E" over the first bottom edge at v that creates it (order of insertion, as Decomposition.assemble)"""
+		me, ne = len(self.e_stamped), len(bottom_edges)
+		offset = nb * len(self.v_stamped)
+		column, side, pair = self.e_shared[:, 0], self.e_shared[:, 1], self.e_shared[:, 2]
+		key = bottom_edges[:, side] * self.e_shared_pairs + pair
+		occurrence = np.arange(ne, dtype=np.int64)[:, np.newaxis] * me + column
+		first = np.full(nb * self.e_shared_pairs, ne * me, dtype=np.int64)
+		np.minimum.at(first, key.ravel(), occurrence.ravel())
+		keep = np.ones((ne, me), dtype=bool)
+		keep[:, column] = first[key] == occurrence
+		return np.concatenate((edges[:offset], edges[offset:][keep.ravel()]))
+
+def first_pairs(edges):
+	"""Edges (m, 2) without repeated undirected pairs, keeping the first occurrence"""
+	seen, kept = set(), []
+	for s, t in edges.tolist():
+		if (min(s, t), max(s, t)) not in seen:
+			seen.add((min(s, t), max(s, t)))
+			kept.append((s, t))
+	return np.array(kept, dtype=np.int64).reshape(-1, 2)
+
+def open_buffers(spec, mode = "r+"):
+	"""Memory-mapped arrays of spec = {name: (path, dtype, shape)}; empty arrays are not mapped"""
+	out = {}
+	for name, (path, dtype, shape) in spec.items():
+		shape = tuple(shape)
+		if 0 in shape:
+			out[name] = np.empty(shape, dtype=dtype)
+		else:
+			out[name] = np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+	return out
+
+def stamp_job(job):
+	"""Run one part of a partitioned assembly: (assembler, method name, arguments, output buffer spec)"""
+	assembler, method, args, spec = job
+	getattr(assembler, method)(open_buffers(spec), *args)
+
+class BatchAssembler(object):
+	"""Assembles the upper graph of any decomposition (assembly graph with lower charts) in batches.
+
+	Assembly vertices are glued in topological order (Decomposition.order), so upper vertices and edges are
+	numbered as in Decomposition.assemble. Vertices at the same depth of the assembly graph with the same
+	production and the same gluings on in-edges (in order, with the productions they come from) form a batch:
+	its chart rows, new vertices, bonding map and candidate edges are stamped from compiled templates."""
+
+	def __init__(self, cls):
+		self.cls = cls
+		self.templates = {}
+		self.signatures = {}
+
+	def template(self, key):
+		"""Top size, top edges, relative positions and bonding map (f, mid) of production with given key"""
+		if key not in self.templates:
+			t = self.cls.get_productions()[key].get_template()
+			self.templates[key] = (t.top_size, t.edges, t.relpos, t.bonding, t.mid)
+		return self.templates[key]
+
+	def glued_columns(self, key, signature):
+		"""Columns of the chart of production key set by gluings of signature, as (source columns, target
+		columns) in order, and the remaining (new) columns"""
+		if (key, signature) not in self.signatures:
+			glued = np.zeros(self.template(key)[0], dtype=bool)
+			steps = []
+			for gluing, source in signature:
+				target = self.cls.get_gluings()[gluing].get_template().top
+				steps.append((np.arange(len(target)), target))
+				glued[target] = True
+			self.signatures[(key, signature)] = (steps, np.flatnonzero(~glued))
+		return self.signatures[(key, signature)]
+
+	def assemble(self, d):
+		"""Assemble upper graph and bonding map of decomposition d; returns decomposition with upper graph,
+		bonding map and charts, mapping production keys to (assembly vertices, chart rows)"""
+		ag, g = d.assembly_graph, d.bottom_graph
+		productions, gluings = ag.vertex_properties["productions"], ag.edge_properties["gluings"]
+		order = d.order()
+
+		# Production, in-neighbours and depth of assembly vertices, their counts of new upper vertices and
+		# their rows in the chart array of their production
+		key, sources, depth = {}, {}, {}
+		batches, members = {}, {}
+		created = np.zeros(len(order), dtype=np.int64)
+		slot = np.zeros(len(order), dtype=np.int64)
+		for v in order:
+			key[v] = productions[ag.vertex(v)]
+			sources[v] = [int(u) for u in ag.get_in_neighbours(v)]
+			signature = tuple((gluings[ag.edge(u, v)], key[u]) for u in sources[v])
+			depth[v] = max([depth[u] + 1 for u in sources[v]] or [0])
+			created[v] = len(self.glued_columns(key[v], signature)[1])
+			slot[v] = len(members.setdefault(key[v], []))
+			members[key[v]].append(v)
+			batches.setdefault((depth[v], key[v], signature), []).append(v)
+
+		position = np.empty(len(order), dtype=np.int64)
+		position[order] = np.arange(len(order))
+		offset = np.zeros(len(order), dtype=np.int64)
+		offset[order] = np.cumsum(created[order]) - created[order]
+		n = int(created.sum())
+
+		relpos = np.empty((n, 2))
+		f = np.empty((n, 2), dtype=np.int64)
+		mid = np.empty(n, dtype=bool)
+		charts = dict((k, np.empty((len(m), self.template(k)[0]), dtype=np.int64)) for k, m in members.items())
+		width = max([len(self.template(k)[1]) for k in members] + [1])
+		candidates, ranks = [], []
+
+		for level, k, signature in sorted(batches, key=lambda b: b[0]):
+			batch = np.array(batches[(level, k, signature)], dtype=np.int64)
+			size, edges, template_relpos, template_f, template_mid = self.template(k)
+			steps, new = self.glued_columns(k, signature)
+
+			chart = np.empty((len(batch), size), dtype=np.int64)
+			for j, (source_columns, target_columns) in enumerate(steps):
+				source = slot[[sources[v][j] for v in batch]]
+				chart[:, target_columns] = charts[signature[j][1]][source][:, source_columns]
+			chart[:, new] = offset[batch, np.newaxis] + np.arange(len(new))
+			charts[k][slot[batch]] = chart
+
+			# Bonding map of new vertices through lower charts
+			lower = np.array([d.lower_chart[ag.vertex(v)].get_arrays()[0][:, 0] for v in batch], dtype=np.int64).reshape(len(batch), -1)
+			placed = chart[:, new].ravel()
+			relpos[placed] = np.tile(template_relpos[new], (len(batch), 1))
+			f[placed, 0] = lower[:, template_f[new, 0]].ravel()
+			f[placed, 1] = lower[:, template_f[new, 1]].ravel()
+			mid[placed] = np.tile(template_mid[new], len(batch))
+
+			candidates.append(np.stack((chart[:, edges[:, 0]], chart[:, edges[:, 1]]), axis=-1).reshape(-1, 2))
+			ranks.append((position[batch, np.newaxis] * width + np.arange(len(edges))).ravel())
+
+		# Keep first occurrence of every (undirected) edge, in order of gluing
+		edges = np.zeros((0, 2), dtype=np.int64)
+		if candidates:
+			edges = np.concatenate(candidates)[np.argsort(np.concatenate(ranks), kind="mergesort")]
+		pair = np.minimum(edges[:, 0], edges[:, 1]) * n + np.maximum(edges[:, 0], edges[:, 1])
+		_, first = np.unique(pair, return_index=True)
+		edges = edges[np.sort(first)]
+
+		count("vertices_created", n)
+		count("edges_created", len(edges))
+		count("edge_candidates", len(pair))
+		count("chart_lookups_avoided", sum(c.size for c in charts.values()))
+		count("bytes_allocated", relpos.nbytes + f.nbytes + mid.nbytes + pair.nbytes + 2 * edges.nbytes + sum(c.nbytes for c in charts.values()))
+
+		result = Decomposition.from_arrays(self.cls, g, edges, relpos, f, mid)
+		result.assembly_graph, result.lower_chart = ag, d.lower_chart
+		result.charts = dict((k, (np.array(members[k], dtype=np.int64), charts[k])) for k in members)
+		return result
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of the shipped diagrams: time per phase and peak memory per level, baselines and correctness checks"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from .diagram import ElementaryMarkovDiagram
+from .diagrams import DIAGRAMS, SubdivisionDiagram
+from .instrument import MemorySink, ProfileSink, instrumented, span
+from .maps import position_array
+from .plan import predict
+from .render import draw_job, render_job
+from .sequence import MarkovSequence
+from .storage import write_json
+
+FORMAT = 1
+
+PHASES = ["decompose", "assemble", "layout", "render"]
+MEMORY = ["traced_peak", "peak_rss"]
+
+# Diagrams of the engine checks: the shipped ones and a general (not elementary) one
+CHECKED = dict(DIAGRAMS, subdivision=SubdivisionDiagram)
+
+def bench_layouts(n):
+	"""Layout parameters of levels 1, ..., n: any fixed choice will do, as long as all runs use the same one"""
+	return [((0.4**i, 0), (0, 0.4**i)) for i in range(n)]
+
+def bench_levels(cls, max_vertices = 2**18):
+	"""Levels 1, ..., k of cls with at most max_vertices vertices and as many edges each, by predict (past those
+	drawn by the figures); general diagrams are assembled to find them"""
+	if issubclass(cls, ElementaryMarkovDiagram):
+		sizes = ((size["level"], size["vertices"], size["edges"]) for size in predict(cls))
+	else:
+		sizes = ((i, g.num_vertices(), g.num_edges()) for i, g in MarkovSequence(cls, 32))
+	levels = []
+	for level, vertices, edges in itertools.islice(sizes, 33):
+		if vertices > max_vertices or edges > max_vertices:
+			break
+		if level > 0:
+			levels.append(level)
+	return levels
+
+def peak_rss():
+	"""High-water resident set size of this process in bytes, None where the resource module is missing"""
+	try:
+		import resource
+	except ImportError:
+		return None
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return rss if sys.platform == "darwin" else rss * 1024
+
+def measure(name, level, repeat = 3, phases = PHASES, renderer = "graph_draw"):
+	"""Measure building level of diagram name from the level below it: best seconds of each phase over repeat
+	runs, counters of one run, and peak memory of one more run with tracemalloc on (Python 3 only, as it slows
+	allocation down). Renders to a temporary directory."""
+	if repeat < 1:
+		raise ValueError("repeat must be at least 1")
+	cls = DIAGRAMS[name]
+	layouts = bench_layouts(level)
+	for i, g in MarkovSequence(cls, level - 1, layouts):
+		pass
+
+	directory = tempfile.mkdtemp(prefix="markov-bench-")
+	def build(run):
+		if "decompose" in phases and issubclass(cls, ElementaryMarkovDiagram):
+			# General diagrams decompose within assemble
+			with span("decompose"):
+				cls.decompose(g)
+		d = cls.assemble(g)
+		if "layout" in phases or "render" in phases:
+			d.layout(*layouts[level - 1])
+		if "render" in phases:
+			output = os.path.join(directory, "%d.png" % run)
+			render_job(dict(draw_job(d.upper_graph, position_array(d.upper_graph), output), renderer=renderer))
+		return d.upper_graph
+
+	best = dict((phase, None) for phase in phases)
+	memory = ProfileSink(profile=False, memory=True)
+	try:
+		for run in range(repeat):
+			with instrumented(MemorySink()) as sink:
+				ug = build(run)
+			seconds = dict((path, s) for path, (calls, s) in sink.totals().items())
+			for phase in phases:
+				t = seconds.get(phase, 0.0)
+				best[phase] = t if best[phase] is None else min(best[phase], t)
+		if sys.version_info[0] >= 3:
+			with instrumented(memory):
+				build(repeat)
+	finally:
+		shutil.rmtree(directory, ignore_errors=True)
+
+	record = {
+		"diagram": name,
+		"level": level,
+		"vertices": ug.num_vertices(),
+		"edges": ug.num_edges(),
+		"traced_peak": memory.traced[1] if memory.traced is not None else None,
+		"peak_rss": peak_rss(),
+		"counters": sink.counters
+	}
+	record.update(best)
+	return record
+
+def measure_task(args):
+	return measure(*args)
+
+def run(names = None, levels = None, repeat = 3, phases = PHASES, renderer = "graph_draw", max_vertices = 2**18, isolate = True):
+	"""Benchmark diagrams (default: all) at given levels (default: bench_levels). Yields one record per level.
+
+	With isolate=True every level is measured in a fresh worker process, so that peak_rss is the high-water
+	mark of building that level alone (with the level below it in memory)."""
+	tasks = []
+	for name in sorted(names or DIAGRAMS):
+		selected = bench_levels(DIAGRAMS[name], max_vertices) if levels is None else [i for i in levels if i > 0]
+		tasks += [(name, i, repeat, phases, renderer) for i in selected]
+
+	if not isolate:
+		for task in tasks:
+			yield measure_task(task)
+		return
+	pool = multiprocessing.Pool(1, maxtasksperchild=1)
+	try:
+		for record in pool.imap(measure_task, tasks):
+			yield record
+	finally:
+		pool.close()
+		pool.join()
+
+def scaling(name, level, processes = (1, 2, 4), repeat = 3):
+	"""Time of assembling level of diagram name by its ElementaryAssembler with each number of processes, best
+	of repeat runs with the pool already started (as for all but the first level of a sequence). Returns
+	list of dicts: processes, seconds, speedup and efficiency relative to the first number of processes."""
+	if repeat < 1:
+		raise ValueError("repeat must be at least 1")
+	cls = DIAGRAMS[name]
+	for i, g in MarkovSequence(cls, level - 1):
+		pass
+	a = cls.get_assembler()
+	result = []
+	try:
+		for p in processes:
+			a.assemble(g, p)
+			best = None
+			for run in range(repeat):
+				start = time.time()
+				a.assemble(g, p)
+				seconds = time.time() - start
+				best = seconds if best is None else min(best, seconds)
+			result.append({"diagram": name, "level": level, "processes": p, "seconds": best})
+	finally:
+		a.close()
+	for r in result:
+		r["speedup"] = result[0]["seconds"] / r["seconds"]
+		r["efficiency"] = r["speedup"] * result[0]["processes"] / r["processes"]
+	return result
+
+def environment():
+	import graph_tool
+	return {
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"graph_tool": getattr(graph_tool, "__version__", None),
+		"machine": platform.machine(),
+		"system": platform.system(),
+		"processor": platform.processor(),
+		"cpus": multiprocessing.cpu_count()
+	}
+
+def save_baseline(path, records):
+	"""Write records with a description of the environment to a JSON baseline"""
+	baseline = {"format": FORMAT, "created": time.time(), "environment": environment(), "results": list(records)}
+	directory = os.path.dirname(os.path.abspath(path))
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+	write_json(path, baseline, indent=1, sort_keys=True)
+	return baseline
+
+def load_baseline(path):
+	with open(path) as f:
+		baseline = json.load(f)
+	if baseline.get("format") != FORMAT:
+		raise ValueError("Unsupported benchmark baseline format in " + path)
+	return baseline
+
+def compare(records, baseline, threshold = 0.2, min_seconds = 0.005, min_bytes = 2**20):
+	"""Regressions of records against a baseline: list of (diagram, level, metric, old, new), one for every
+	phase time or peak memory more than threshold (relative) worse than in the baseline. Differences below
+	min_seconds or min_bytes are noise."""
+	old = dict(((r["diagram"], r["level"]), r) for r in baseline["results"])
+	regressions = []
+	for r in records:
+		b = old.get((r["diagram"], r["level"]))
+		if b is None:
+			continue
+		for metric in PHASES + MEMORY:
+			if r.get(metric) is None or b.get(metric) is None:
+				continue
+			floor = min_bytes if metric in MEMORY else min_seconds
+			if r[metric] > b[metric] * (1 + threshold) and r[metric] - b[metric] > floor:
+				regressions.append((r["diagram"], r["level"], metric, b[metric], r[metric]))
+	return regressions
+
+def format_value(metric, value):
+	if value is None:
+		return "-"
+	if metric in MEMORY:
+		return "%.1fM" % (value / 1024.0**2)
+	return "%.4f" % value
+
+def report(records, baseline = None):
+	"""Text table of records, with the ratio to the baseline after every value present in it"""
+	old = dict(((r["diagram"], r["level"]), r) for r in baseline["results"]) if baseline else {}
+	metrics = PHASES + MEMORY
+	lines = ["%-12s %5s %9s %9s " % ("diagram", "level", "vertices", "edges") + " ".join("%17s" % m for m in metrics)]
+	for r in records:
+		b = old.get((r["diagram"], r["level"]), {})
+		cells = []
+		for m in metrics:
+			cell = format_value(m, r.get(m))
+			if b.get(m) and r.get(m) is not None:
+				cell += " (%.2fx)" % (r[m] / float(b[m]))
+			cells.append("%17s" % cell)
+		lines.append("%-12s %5d %9d %9d " % (r["diagram"], r["level"], r["vertices"], r["edges"]) + " ".join(cells))
+	return "\n".join(lines)
+
+def engines(cls):
+	"""Assembly engines to check against Decomposition.assemble: dict name -> function of the bottom graph"""
+	result = {"batch": lambda g: cls.get_batch_assembler().assemble(cls.decompose(g))}
+	if issubclass(cls, ElementaryMarkovDiagram):
+		result["elementary"] = lambda g: cls.get_assembler().assemble(g)
+		result["elementary_pool"] = lambda g: cls.get_assembler().assemble(g, 2)
+	return result
+
+def bonding_invariants(decompositions, decimals = None):
+	"""Integer vertex invariants of upper graphs, equal for vertices with equal image in the common bottom
+	graph (a vertex or the midpoint of an edge). With decimals, also equal relative positions rounded to
+	that many decimals"""
+	images = []
+	for d in decompositions:
+		f, mid = d.bonding_map.get_arrays()
+		image = [np.sort(f, axis=1), mid]
+		if decimals is not None:
+			image.append(np.round(position_array(d.upper_graph, "relpos"), decimals))
+		images.append(np.column_stack(image))
+	_, inverse = np.unique(np.concatenate(images), axis=0, return_inverse=True)
+	return np.split(inverse.reshape(-1), np.cumsum([len(i) for i in images])[:-1])
+
+def same_assembly(reference, d, decimals = 9):
+	"""Whether the upper graphs of two decompositions of the same bottom graph are isomorphic by an
+	isomorphism commuting with the bonding maps and preserving relative positions (rounded to decimals).
+	Identical edge lists, bonding maps and close relative positions are checked first."""
+	from graph_tool.all import isomorphism
+
+	a, b = reference.get_arrays(), d.get_arrays()
+	if len(a["bonding"]) != len(b["bonding"]) or len(a["edges"]) != len(b["edges"]):
+		return False
+	edges = [np.unique(np.sort(x["edges"], axis=1), axis=0) for x in (a, b)]
+	if np.array_equal(edges[0], edges[1]) and np.array_equal(a["bonding"], b["bonding"]) and np.array_equal(a["mid"], b["mid"]) \
+			and np.allclose(a["relpos"], b["relpos"]):
+		return True
+
+	invariants = []
+	for x, inv in zip((reference, d), bonding_invariants((reference, d), decimals)):
+		p = x.upper_graph.new_vertex_property("int64_t")
+		p.a = inv
+		invariants.append(p)
+	return isomorphism(reference.upper_graph, d.upper_graph, invariants[0], invariants[1])
+
+def check(names = None, levels = None, max_vertices = 2**12):
+	"""Check every engine against the reference Decomposition.assemble at given levels (default: bench_levels
+	with max_vertices) for the diagrams of CHECKED. Yields (diagram, level, engine, ok)."""
+	for name in sorted(names or CHECKED):
+		cls = CHECKED[name]
+		selected = bench_levels(cls, max_vertices) if levels is None else [i for i in levels if i > 0]
+		if not selected:
+			continue
+		for i, g in MarkovSequence(cls, max(selected) - 1):
+			if i + 1 not in selected:
+				continue
+			reference = cls.decompose(g)
+			reference.assemble()
+			for engine, assemble in sorted(engines(cls).items()):
+				yield name, i + 1, engine, same_assembly(reference, assemble(g))
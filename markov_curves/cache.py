@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed on-disk cache of assembled levels"""
+
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from .connectivity import track
+from .decomposition import Decomposition
+from .maps import edge_array, position_array
+from .storage import write_directory
+
+FORMAT = 1
+
+RECORD = ["edges", "relpos", "bonding", "mid"]
+
+def hash_arrays(h, *arrays):
+	for a in arrays:
+		a = np.ascontiguousarray(a)
+		h.update(str(a.dtype).encode() + str(a.shape).encode())
+		h.update(a.tobytes())
+
+def graph_fingerprint(h, g, positions = True):
+	hash_arrays(h, np.array([g.num_vertices()]), edge_array(g).astype(np.int64))
+	if positions and "pos" in g.vp:
+		hash_arrays(h, position_array(g))
+
+def diagram_fingerprint(cls):
+	"""Hash of the productions and gluings of a diagram (their content, not their names)"""
+	h = hashlib.sha1()
+	h.update(("markov_curves level cache %d" % FORMAT).encode())
+	productions = cls.get_productions()
+	for key in sorted(productions):
+		h.update(key.encode())
+		p = productions[key]
+		if p is None:
+			continue
+		graph_fingerprint(h, p.get_top())
+		graph_fingerprint(h, p.get_bottom(), positions=False)
+		hash_arrays(h, *p.get_bonding_map().get_arrays())
+	gluings = cls.get_gluings()
+	for key in sorted(gluings):
+		h.update(key.encode())
+		gl = gluings[key]
+		if gl is None:
+			continue
+		hash_arrays(h, *gl.get_top_glue().get_arrays())
+		hash_arrays(h, *gl.get_bottom_glue().get_arrays())
+	return h.hexdigest()
+
+def level_key(cls, starting_graph, level):
+	"""Cache key of given level of the sequence of cls starting from starting_graph (positions are ignored:
+	they do not affect assembly)"""
+	h = hashlib.sha1()
+	h.update(diagram_fingerprint(cls).encode())
+	graph_fingerprint(h, starting_graph, positions=False)
+	h.update(("level %d" % level).encode())
+	return h.hexdigest()
+
+class LevelCache(object):
+	"""Directory of level records, one subdirectory of .npy files per key, evicted least recently used first
+	once their total size exceeds max_bytes"""
+
+	def __init__(self, root, max_bytes = 2 * 1024**3):
+		self.root = root
+		self.max_bytes = max_bytes
+		if not os.path.isdir(root):
+			os.makedirs(root)
+
+	def path(self, key):
+		return os.path.join(self.root, key)
+
+	def get(self, key):
+		"""Memory-mapped arrays of the record, or None"""
+		path = self.path(key)
+		if not os.path.isdir(path):
+			return None
+		try:
+			record = dict((name, np.load(os.path.join(path, name + ".npy"), mmap_mode="r")) for name in RECORD)
+		except (IOError, OSError, ValueError):
+			return None
+		os.utime(path, None)
+		return record
+
+	def put(self, key, record):
+		path = self.path(key)
+		if os.path.isdir(path):
+			return
+		def write(tmp):
+			for name in RECORD:
+				np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(record[name]))
+		write_directory(path, write)
+		self.evict()
+
+	def entries(self):
+		"""List of (last use, size, path) of all records"""
+		result = []
+		for key in os.listdir(self.root):
+			path = self.path(key)
+			if key.startswith(".") or not os.path.isdir(path):
+				continue
+			size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+			result.append((os.path.getmtime(path), size, path))
+		return result
+
+	def evict(self):
+		entries = sorted(self.entries())
+		total = sum(size for _, size, _ in entries)
+		for _, size, path in entries:
+			if total <= self.max_bytes:
+				break
+			shutil.rmtree(path, ignore_errors=True)
+			total -= size
+
+	def assemble(self, cls, g, key, processes = None, connectivity = False):
+		"""Decomposition of g by diagram cls, loaded from the record under key or assembled and stored"""
+		record = self.get(key)
+		if record is not None:
+			d = Decomposition.from_arrays(cls, g, record["edges"], record["relpos"], record["bonding"], record["mid"])
+			return track(d, g.num_vertices()) if connectivity else d
+		d = cls.assemble(g, processes, connectivity)
+		self.put(key, d.get_arrays())
+		return d
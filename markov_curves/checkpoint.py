@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Checkpoints of long sequence runs: every completed level is stored atomically, so a run can resume"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .cache import diagram_fingerprint, graph_fingerprint, hash_arrays
+from .maps import position_array
+from .storage import write_directory, write_json
+
+FORMAT = 1
+
+RECORD = ["edges", "relpos", "bonding", "mid", "pos"]
+
+def positions_key(parent, layout):
+	"""Key of the positions of a level laid out by layout = (d1, d2) from parent positions with key parent
+	(None: the level has no positions)"""
+	if parent is None or layout is None:
+		return None
+	h = hashlib.sha1(parent.encode())
+	hash_arrays(h, np.array(layout, dtype=float))
+	return h.hexdigest()
+
+def starting_key(g):
+	"""Key of the positions of a starting graph"""
+	h = hashlib.sha1(b"markov_curves starting positions")
+	if "pos" in g.vp:
+		hash_arrays(h, position_array(g))
+	return h.hexdigest()
+
+class Checkpoint(object):
+	"""Directory of the levels of one run of a sequence (level-0001/, ... with .npy files of the upper graph,
+	bonding map and positions) and manifest.json with the parameters of the run: diagram and starting graph
+	fingerprints, and for every level its sizes, layout, key of its positions and SHA-1 of its arrays.
+
+	A level directory is written to a temporary directory and renamed, and the manifest is replaced only
+	after that, so a crash loses at most the level being written. Levels are valid up to the first one that
+	is missing or does not match its hashes; later ones are assembled again."""
+
+	def __init__(self, root):
+		self.root = root
+		self.manifest = None
+		self.broken = None
+
+	def path(self, level):
+		return os.path.join(self.root, "level-%04d" % level)
+
+	def open(self, cls, starting_graph):
+		"""Load the manifest of a run of cls from starting_graph, or start a new one. Raises ValueError if the
+		directory holds a run of another diagram or starting graph."""
+		h = hashlib.sha1()
+		graph_fingerprint(h, starting_graph, positions=False)
+		run = {"format": FORMAT, "diagram": cls.__name__, "fingerprint": diagram_fingerprint(cls), "starting_graph": h.hexdigest()}
+
+		manifest_path = os.path.join(self.root, "manifest.json")
+		if os.path.exists(manifest_path):
+			with open(manifest_path) as f:
+				manifest = json.load(f)
+			for key, value in run.items():
+				if manifest.get(key) != value:
+					raise ValueError("Checkpoint " + self.root + " holds another run (" + key + " differs)")
+			self.manifest = manifest
+		else:
+			if not os.path.isdir(self.root):
+				os.makedirs(self.root)
+			self.manifest = dict(run, levels={})
+		self.broken = None
+		return self
+
+	def levels(self):
+		"""Levels listed in the manifest"""
+		return sorted(int(level) for level in self.manifest["levels"])
+
+	def entry(self, level):
+		return self.manifest["levels"].get(str(level))
+
+	def load(self, level, bottom_vertices):
+		"""Verified arrays of level with bottom graph of bottom_vertices vertices, with its manifest entry under
+		"entry", or None if the level (or one below it) is not stored or is damaged"""
+		entry = self.entry(level)
+		if entry is None or entry["bottom_vertices"] != bottom_vertices or (self.broken is not None and level >= self.broken):
+			return None
+		record = {"entry": entry}
+		try:
+			for name in entry["hashes"]:
+				a = np.load(os.path.join(self.path(level), name + ".npy"))
+				h = hashlib.sha1()
+				hash_arrays(h, a)
+				if h.hexdigest() != entry["hashes"][name]:
+					raise ValueError("hash mismatch")
+				record[name] = a
+		except (IOError, OSError, ValueError):
+			self.broken = level
+			return None
+		return record
+
+	def save(self, level, d, layout, key):
+		"""Store upper graph, bonding map and positions (if laid out) of decomposition d as level"""
+		record = d.get_arrays()
+		if "pos" in d.upper_graph.vp:
+			record["pos"] = position_array(d.upper_graph)
+		else:
+			key = None
+
+		hashes = {}
+		def write(tmp):
+			for name in RECORD:
+				if name in record:
+					a = np.ascontiguousarray(record[name])
+					np.save(os.path.join(tmp, name + ".npy"), a)
+					h = hashlib.sha1()
+					hash_arrays(h, a)
+					hashes[name] = h.hexdigest()
+		write_directory(self.path(level), write, replace=True)
+
+		self.manifest["levels"][str(level)] = {
+			"bottom_vertices": d.bottom_graph.num_vertices(),
+			"vertices": d.upper_graph.num_vertices(),
+			"edges": d.upper_graph.num_edges(),
+			"layout": None if layout is None else np.array(layout, dtype=float).tolist(),
+			"positions": key,
+			"hashes": hashes
+		}
+		if self.broken == level:
+			self.broken = None
+		self.write_manifest()
+
+	def write_manifest(self):
+		write_json(os.path.join(self.root, "manifest.json"), self.manifest, indent=1, sort_keys=True)
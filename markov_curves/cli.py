@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Command line interface: markov-curves render FIGURE [FIGURE ...] [--levels 0-5]"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+
+from termcolor import colored
+
+def parse_levels(s):
+	"""Parse level selection such as "3", "0-5" or "0,2,4-5" """
+	levels = set()
+	for part in s.split(","):
+		if "-" in part:
+			a, b = part.split("-")
+			levels.update(range(int(a), int(b) + 1))
+		else:
+			levels.add(int(part))
+	return sorted(levels)
+
+def render_command(args):
+	from .cache import LevelCache
+	from .checkpoint import Checkpoint
+	from .figures import FIGURES
+	from .instrument import JSONLinesSink, MemorySink, ProfileSink, instrumented
+	from .render import pipeline, render
+
+	names = args.figures
+	if not names or "all" in names:
+		names = sorted(FIGURES)
+
+	cache = None
+	if args.cache:
+		cache = LevelCache(args.cache, max_bytes=int(args.cache_size * 1024**2))
+
+	sinks = []
+	if args.trace:
+		sinks.append(JSONLinesSink(args.trace))
+	if args.profile:
+		sinks.append(ProfileSink(output=args.profile))
+	if args.report:
+		sinks.append(MemorySink())
+
+	def figures():
+		for name in names:
+			generate, (w, h), _ = FIGURES[name]
+			options = dict(levels=args.levels, cache=cache, from_level=args.from_level)
+			if args.checkpoint:
+				options["checkpoint"] = Checkpoint(os.path.join(args.checkpoint, name))
+			if args.layout is not None:
+				options["variants"] = (args.layout,)
+			yield generate(w, h, **options)
+
+	with instrumented(*sinks):
+		if args.pipeline:
+			pipeline(itertools.chain.from_iterable(figures()), threads=args.threads, depth=args.queue, renderer=args.renderer)
+		else:
+			render(list(itertools.chain.from_iterable(figures())), processes=args.processes, renderer=args.renderer)
+
+	if args.report:
+		print(sinks[-1].report())
+
+def bench_command(args):
+	from . import bench
+
+	names = args.diagrams or None
+	if args.check:
+		failed = 0
+		for name, level, engine, ok in bench.check(names, args.levels):
+			print("%-12s %5d %-16s %s" % (name, level, engine, colored("ok", "green") if ok else colored("FAILED", "red")))
+			failed += not ok
+		return 1 if failed else 0
+
+	if args.scaling:
+		print("%-12s %5s %9s %10s %8s %10s" % ("diagram", "level", "processes", "seconds", "speedup", "efficiency"))
+		for name in sorted(names or bench.DIAGRAMS):
+			level = max(args.levels or bench.bench_levels(bench.DIAGRAMS[name], args.max_vertices))
+			for r in bench.scaling(name, level, args.scaling, args.repeat):
+				print("%-12s %5d %9d %10.4f %8.2f %10.2f" % (name, level, r["processes"], r["seconds"], r["speedup"], r["efficiency"]))
+				sys.stdout.flush()
+		print("(%d CPUs)" % multiprocessing.cpu_count())
+		return 0
+
+	records = []
+	baseline, output = None, args.output
+	if args.baseline and os.path.exists(args.baseline):
+		baseline = bench.load_baseline(args.baseline)
+	elif args.baseline:
+		# Baselines depend on the machine, so the first run on one records it
+		print(colored("No baseline " + args.baseline + ", recording this run as the baseline", "yellow"))
+		output = output or args.baseline
+	phases = [phase for phase in bench.PHASES if phase in args.phases]
+	if args.renderer == "none":
+		phases = [phase for phase in phases if phase != "render"]
+	for record in bench.run(names, args.levels, args.repeat, phases, args.renderer, args.max_vertices, not args.no_isolate):
+		# Header once, then a row per level as soon as it is measured
+		print("\n".join(bench.report([record], baseline).split("\n")[1 if records else 0:]))
+		sys.stdout.flush()
+		records.append(record)
+	if output:
+		bench.save_baseline(output, records)
+
+	if baseline is not None:
+		regressions = bench.compare(records, baseline, args.threshold)
+		for name, level, metric, old, new in regressions:
+			print(colored("regression: %s level %d %s %s -> %s" % (name, level, metric, bench.format_value(metric, old), bench.format_value(metric, new)), "red"))
+		if regressions:
+			return 1
+	return 0
+
+def main(argv = None):
+	from .bench import CHECKED, PHASES as bench_phases
+	from .diagrams import DIAGRAMS
+	from .figures import FIGURES
+
+	if argv is None:
+		argv = sys.argv[1:]
+	if not argv:
+		argv = ["render"]
+
+	parser = argparse.ArgumentParser(prog="markov-curves", description="Elementary Markov Sequence Generator")
+	commands = parser.add_subparsers(dest="command")
+
+	p = commands.add_parser("render", help="render levels of figures into diagrams/")
+	p.add_argument("figures", nargs="*", metavar="FIGURE", help="one of: " + ", ".join(sorted(FIGURES) + ["all"]) + " (default: all)")
+	p.add_argument("--levels", type=parse_levels, default=None, help="levels to render, e.g. 3, 0-5 or 0,2,4 (default: all)")
+	p.add_argument("--layout", choices=["fixed", "sfdp", "warm"], default=None, help="render only one layout variant; warm renders the sfdp figures with each level seeded from the previous one")
+	p.add_argument("--renderer", choices=["graph_draw", "lod"], default="graph_draw", help="lod culls sub-pixel detail and draws with cairo directly")
+	p.add_argument("--processes", type=int, default=None, help="size of the rendering process pool")
+	p.add_argument("--pipeline", action="store_true", help="render each level in threads while the next one is assembled, instead of assembling all levels first")
+	p.add_argument("--threads", type=int, default=1, help="rendering threads of --pipeline (default: 1)")
+	p.add_argument("--queue", type=int, default=2, help="levels waiting for a rendering thread before assembly pauses (default: 2)")
+	p.add_argument("--cache", default=os.environ.get("MARKOV_CURVES_CACHE"), help="directory of cached levels (default: $MARKOV_CURVES_CACHE, no cache if unset)")
+	p.add_argument("--cache-size", type=float, default=2048, help="cache size limit in MB (default: 2048)")
+	p.add_argument("--checkpoint", default=None, help="directory to store every completed level in and to resume runs from")
+	p.add_argument("--from-level", type=int, default=None, help="start from this checkpointed level, keeping its positions and laying out deeper levels anew")
+	p.add_argument("--trace", metavar="PATH", default=None, help="append timing spans and counters as JSON lines to PATH")
+	p.add_argument("--report", action="store_true", help="print time per phase and counter totals when done")
+	p.add_argument("--profile", metavar="PATH", default=None, help="write cProfile statistics to PATH")
+	p.set_defaults(run=render_command)
+
+	b = commands.add_parser("bench", help="time and measure memory of every phase of deep levels, or check assembly engines")
+	b.add_argument("diagrams", nargs="*", metavar="DIAGRAM", help="one of: " + ", ".join(sorted(DIAGRAMS)) + " (default: all; --check also takes subdivision, a general diagram)")
+	b.add_argument("--levels", type=parse_levels, default=None, help="levels to measure (default: all with at most --max-vertices vertices and edges)")
+	b.add_argument("--max-vertices", type=int, default=2**18, help="vertices and edges of the deepest default level (default: 262144)")
+	b.add_argument("--repeat", type=int, default=3, help="runs per level, the best time of each phase is kept (default: 3)")
+	b.add_argument("--phases", type=lambda s: s.split(","), default=bench_phases, help="comma separated phases to measure (default: " + ",".join(bench_phases) + ")")
+	b.add_argument("--renderer", choices=["graph_draw", "lod", "none"], default="graph_draw", help="renderer of the render phase")
+	b.add_argument("--no-isolate", action="store_true", help="measure in this process (peak memory is then cumulative)")
+	b.add_argument("--baseline", default=None, help="JSON baseline to report ratios and regressions against, written by this run if missing; exits with status 1 on a regression")
+	b.add_argument("--threshold", type=float, default=0.2, help="relative slowdown or memory growth counted as a regression (default: 0.2)")
+	b.add_argument("--output", default=None, help="write results as a JSON baseline")
+	b.add_argument("--scaling", type=parse_levels, default=None, metavar="PROCESSES", help="instead of measuring phases, time parallel assembly of the deepest level with each number of processes, such as 1,2,4")
+	b.add_argument("--check", action="store_true", help="instead of measuring, check that every assembly engine matches Decomposition.assemble")
+	b.set_defaults(run=bench_command, figures=[])
+
+	args = parser.parse_args(argv)
+	if getattr(args, "from_level", None) and not args.checkpoint:
+		p.error("--from-level needs --checkpoint")
+	for name in args.figures:
+		if name != "all" and name not in FIGURES:
+			p.error("unknown figure " + name)
+	if getattr(args, "levels", None) is not None and args.command == "render":
+		# Every named figure has to have every requested level, all figures together at least one of each
+		named = [name for name in args.figures if name != "all"]
+		if named and "all" not in args.figures:
+			for name in named:
+				missing = [i for i in args.levels if not 0 <= i < FIGURES[name][2]]
+				if missing:
+					p.error("figure %s has levels 0-%d, not %s" % (name, FIGURES[name][2] - 1, ",".join(map(str, missing))))
+		else:
+			missing = [i for i in args.levels if not 0 <= i < max(n for _, _, n in FIGURES.values())]
+			if missing:
+				p.error("no figure has level " + ",".join(map(str, missing)))
+	for name in getattr(args, "diagrams", []):
+		if name not in (CHECKED if args.check else DIAGRAMS):
+			b.error("unknown diagram " + name)
+	if getattr(args, "repeat", 1) < 1:
+		b.error("--repeat must be at least 1")
+	if getattr(args, "scaling", None) and min(args.scaling) < 1:
+		b.error("--scaling needs numbers of processes of at least 1")
+
+	print(colored("Elementary Markov Sequence Generator", 'blue'))
+	return args.run(args)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Array-based union-find for connectivity of levels and of fibres of bonding maps"""
+
+import numpy as np
+
+class UnionFind(object):
+	"""Union-find over n elements; edges are united in batches by hooking larger roots under smaller ones
+	and compressing all paths at once"""
+
+	def __init__(self, n):
+		self.parent = np.arange(n, dtype=np.int64)
+
+	def roots(self):
+		"""Root of every element (compresses all paths)"""
+		p = self.parent
+		while True:
+			q = p[p]
+			if np.array_equal(q, p):
+				break
+			p = q
+		self.parent = p
+		return p
+
+	def union(self, edges):
+		edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+		while len(edges):
+			r = self.roots()
+			a, b = r[edges[:, 0]], r[edges[:, 1]]
+			different = a != b
+			if not np.any(different):
+				break
+			edges = edges[different]
+			a, b = a[different], b[different]
+			np.minimum.at(self.parent, np.maximum(a, b), np.minimum(a, b))
+
+	def count(self):
+		"""Number of components"""
+		return int(np.count_nonzero(self.roots() == np.arange(len(self.parent))))
+
+class ConnectivityTracker(object):
+	"""Components of an upper graph and of the fibres of its bonding map, from its edges added in one or
+	more batches. The fibre of a bottom vertex b consists of upper vertices mapped to b (vertices mapped to
+	midpoints of edges are in no fibre); its components are those of the induced subgraph."""
+
+	def __init__(self, n, nb):
+		self.nb = nb
+		self.graph = UnionFind(n)
+		self.fibres = UnionFind(n)
+
+	def add_edges(self, edges, f, mid):
+		"""Add upper edges; f, mid is the bonding map, filled at least for endpoints of the edges"""
+		self.graph.union(edges)
+		s, t = edges[:, 0], edges[:, 1]
+		inside = ~mid[s] & ~mid[t] & (f[s, 0] == f[t, 0])
+		self.fibres.union(edges[inside])
+
+	def components(self):
+		return self.graph.count()
+
+	def fibre_components(self, f, mid):
+		"""Number of components of the fibre of every bottom vertex"""
+		r = self.fibres.roots()
+		roots = np.flatnonzero((r == np.arange(len(r))) & ~mid)
+		return np.bincount(f[roots, 0], minlength=self.nb)
+
+def components(n, edges):
+	"""Number of components of a graph with n vertices and (m, 2) edge array"""
+	uf = UnionFind(n)
+	uf.union(edges)
+	return uf.count()
+
+def track(d, nb):
+	"""Set components and fibre_components of a decomposition of a graph with nb vertices from its arrays"""
+	arrays = d.get_arrays()
+	f, mid = arrays["bonding"], arrays["mid"]
+	tracker = ConnectivityTracker(len(f), nb)
+	tracker.add_edges(arrays["edges"], f, mid)
+	d.components = tracker.components()
+	d.fibre_components = tracker.fibre_components(f, mid)
+	return d
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Decompositions of bottom graphs and assembly of upper graphs"""
+
+from graph_tool.all import Graph
+import numpy as np
+
+from .instrument import count, span
+from .maps import Map, anchor_array, position_array
+
+class Decomposition(object):
+	def __init__(self, cls):
+		self.cls = cls
+		self.assembly_graph = None
+		self.upper_chart = None
+		self.lower_chart = None
+
+		self.bottom_graph = None
+		self.top_graph = None
+		self.bonding_map = None
+
+		self.vertex_chart = None
+		self.edge_chart = None
+		self.charts = None
+
+		self.components = None
+		self.fibre_components = None
+
+		# Upper edges (s, t) with s <= t, while assembling
+		self.edge_set = None
+
+	@classmethod
+	def from_arrays(cls, diagram, g, edges, relpos, f, mid):
+		"""Decomposition of g with upper graph given by (m, 2) edge array and (n, 2) relative positions, and
+		bonding map given by (n, 2) target indices and midpoint flags"""
+		d = cls(diagram)
+		d.bottom_graph = g
+		d.upper_graph = ug = Graph(directed=False)
+		if len(relpos):
+			ug.add_vertex(len(relpos))
+		ug.add_edge_list(edges)
+		ug.vp["relpos"] = ug.new_vertex_property("vector<double>")
+		ug.vp.relpos.set_2d_array(np.asarray(relpos).T)
+
+		d.bonding_map = Map.from_arrays(ug, g, f, mid)
+		return d
+
+	def get_arrays(self):
+		"""Upper graph and bonding map as dict of arrays: edges, relpos, bonding, mid"""
+		f, mid = self.bonding_map.get_arrays()
+		return {
+			"edges": self.upper_graph.get_edges()[:, :2].astype(np.int64),
+			"relpos": position_array(self.upper_graph, "relpos"),
+			"bonding": f,
+			"mid": mid
+		}
+
+	def __str__(self):
+		return "Decomposition"
+
+	def order(self):
+		"""Assembly graph vertex indices in topological order: every vertex comes after its in-neighbours.
+
+		This is the order in which a depth-first traversal from vertices 0, 1, ... over in-neighbours finishes
+		vertices, computed with an explicit stack; upper vertices are numbered in this order."""
+		ag = self.assembly_graph
+		n = ag.num_vertices()
+		state = np.zeros(n, dtype=np.int8)
+		order = []
+		for root in range(n):
+			if state[root]:
+				continue
+			state[root] = 1
+			stack = [(root, iter(ag.get_in_neighbours(root)))]
+			while stack:
+				v, neighbours = stack[-1]
+				for w in neighbours:
+					w = int(w)
+					if state[w] == 1:
+						raise ValueError("Assembly graph has a cycle through vertex %d" % w)
+					if state[w] == 0:
+						state[w] = 1
+						stack.append((w, iter(ag.get_in_neighbours(w))))
+						break
+				else:
+					stack.pop()
+					state[v] = 2
+					order.append(v)
+		return order
+
+	def glue_in(self, v):
+		"""Glue into top graph a subgraph corresponding to top graph of a production corresponding to assembly graph vertex v;
+		its in-neighbours have to be glued in already"""
+
+		if v in self.upper_chart:
+			return
+
+		vertex_production = self.cls.get_productions()[self.assembly_graph.vertex_properties["productions"][v]]
+		template = vertex_production.get_template()
+
+		chart = self.upper_chart[v] = Map(vertex_production.get_top(), self.upper_graph)
+
+		# Chart vertices that are already glued in
+		for w in self.assembly_graph.get_in_neighbours(v):
+			w = self.assembly_graph.vertex(w)
+			if w not in self.upper_chart:
+				raise ValueError("Assembly graph vertex %d is glued in before its in-neighbour %d" % (int(v), int(w)))
+			e = self.assembly_graph.edge(w, v)
+			glue = self.cls.get_gluings()[self.assembly_graph.edge_properties["gluings"][e]].get_template().top
+
+			source = self.upper_chart[w].get_arrays()[0][:, 0]
+			for u, t in enumerate(glue.tolist()):
+				chart[t] = source[u]
+
+		# Add new vertices
+		lower = self.lower_chart[v].get_arrays()[0][:, 0]
+		for w in range(template.top_size):
+			if not w in chart:
+				count("vertices_created")
+				x = chart[w] = self.upper_graph.add_vertex()
+				# update bonding map
+				a, b = template.bonding[w]
+				if template.mid[w]:
+					self.bonding_map[x] = [lower[a], lower[b]]
+				else:
+					self.bonding_map[x] = lower[a]
+				# save relative position
+				self.upper_graph.vp.relpos[x] = template.relpos[w].tolist()
+
+		# Add new edges, looked up in the edge set instead of adjacency lists of the upper graph
+		image = chart.get_arrays()[0][:, 0].tolist()
+		new = []
+		for s, t in template.edges.tolist():
+			s, t = image[s], image[t]
+			key = (s, t) if s <= t else (t, s)
+			if key not in self.edge_set:
+				self.edge_set.add(key)
+				new.append((s, t))
+		if new:
+			self.upper_graph.add_edge_list(new)
+		count("edge_checks", len(template.edges))
+		count("edges_created", len(new))
+
+	def assemble(self):
+		"""Create upper graph, upper charts and bonding map of the decomposition using assembly graph and lower charts"""
+
+		self.upper_chart = dict()
+		self.upper_graph = Graph(directed=False)
+		self.upper_graph.vp["relpos"] = self.upper_graph.new_vertex_property("vector<double>")
+
+		self.bonding_map = Map(self.upper_graph, self.bottom_graph)
+
+		self.edge_set = set()
+		with span("glue_in", vertices=self.assembly_graph.num_vertices()):
+			for v in self.order():
+				self.glue_in(self.assembly_graph.vertex(v))
+		self.edge_set = None
+
+	def anchor_positions(self, bottom_pos = None):
+		"""Positions of bonding images of upper vertices (midpoints for edge images) as (n, 2) array, for
+		given bottom positions or the "pos" property of the bottom graph"""
+		f, mid = self.bonding_map.get_arrays()
+		if bottom_pos is None:
+			bottom_pos = position_array(self.bottom_graph)
+		return anchor_array(f, mid, bottom_pos)
+
+	def layout(self, d1, d2):
+		"""Position upper vertices at their bonding images (midpoints for edge images) shifted by relative
+		positions mapped through the linear map with columns d1, d2"""
+		if "pos" in self.upper_graph.vp:
+			return self.upper_graph.vp.pos
+
+		with span("layout", vertices=self.upper_graph.num_vertices()):
+			p = self.anchor_positions() + position_array(self.upper_graph, "relpos").dot(np.array([d1, d2], dtype=float))
+
+		self.upper_graph.vp["pos"] = self.upper_graph.new_vertex_property("vector<double>")
+		self.upper_graph.vp.pos.set_2d_array(p.T)
+
+		return self.upper_graph.vp.pos
+
+	def layout_batch(self, d):
+		"""Evaluate layouts for a batch of k linear maps d[j] = (d1, d2) at once; returns (k, n, 2) positions"""
+		d = np.asarray(d, dtype=float).reshape(-1, 2, 2)
+		rel = position_array(self.upper_graph, "relpos")
+		return self.anchor_positions()[np.newaxis] + np.einsum("ni,kij->knj", rel, d)
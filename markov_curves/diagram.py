@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Productions, gluings and Markov diagrams"""
+
+from graph_tool.all import Graph
+import numpy as np
+
+from .assembly import BatchAssembler, ElementaryAssembler
+from .connectivity import track
+from .decomposition import Decomposition
+from .instrument import span
+from .layout import layout_scores
+from .maps import Map
+from .templates import GluingTemplate, ProductionTemplate
+
+class Definition(object):
+	"""Class-level data (graphs, maps) created by the init() classmethod on first use"""
+
+	@classmethod
+	def init(cls):
+		pass
+
+	@classmethod
+	def initialize(cls):
+		if not cls.__dict__.get("initialized", False):
+			cls.init()
+			cls.initialized = True
+		return cls
+
+class Production(Definition):
+	top = None
+	bottom = None
+	bonding_map = None
+
+	@classmethod
+	def get_top(cls):
+		return cls.initialize().top
+
+	@classmethod
+	def get_bottom(cls):
+		return cls.initialize().bottom
+
+	@classmethod
+	def get_bonding_map(cls):
+		return cls.initialize().bonding_map
+
+	@classmethod
+	def get_template(cls):
+		"""Compiled ProductionTemplate, one per production class and shared by all diagrams using it"""
+		if cls.__dict__.get("template") is None:
+			cls.template = ProductionTemplate(cls)
+		return cls.template
+
+class Gluing(Definition):
+	bottom_glue = None
+	top_glue = None
+	source_production = None
+	target_production = None
+
+	@classmethod
+	def get_top_glue(cls):
+		return cls.initialize().top_glue
+
+	@classmethod
+	def get_bottom_glue(cls):
+		return cls.initialize().bottom_glue
+
+	@classmethod
+	def get_source_production(cls):
+		return cls.initialize().source_production
+	@classmethod
+	def get_target_production(cls):
+		return cls.initialize().target_production
+
+	@classmethod
+	def get_template(cls):
+		"""Compiled GluingTemplate, one per gluing class"""
+		if cls.__dict__.get("template") is None:
+			cls.template = GluingTemplate(cls)
+		return cls.template
+
+class MarkovDiagram(Definition):
+	starting_graph = None
+	productions = None
+	gluings = None
+
+	@classmethod
+	def get_starting_graph(cls):
+		return cls.initialize().starting_graph
+
+	@classmethod
+	def get_productions(cls):
+		return cls.initialize().productions
+
+	@classmethod
+	def get_gluings(cls):
+		return cls.initialize().gluings
+
+	@classmethod
+	def decompose(cls, g):
+		"""Decomposition of bottom graph g with assembly graph (vertex property "productions" and edge property
+		"gluings" holding keys of productions and gluings) and lower charts; defined by each diagram"""
+		raise NotImplementedError("Diagram " + cls.__name__ + " does not define a decomposition")
+
+	@classmethod
+	def get_batch_assembler(cls):
+		if cls.__dict__.get("batch_assembler") is None:
+			cls.batch_assembler = BatchAssembler(cls)
+		return cls.batch_assembler
+
+	@classmethod
+	def assemble(cls, g, processes = None, connectivity = False):
+		"""Same as decompose(g) followed by Decomposition.assemble(), with the upper graph assembled in batches;
+		connectivity=True sets components and fibre components (processes is unused for general diagrams)"""
+		with span("decompose", diagram=cls.__name__, vertices=g.num_vertices()):
+			d = cls.decompose(g)
+		with span("assemble", diagram=cls.__name__, vertices=g.num_vertices()):
+			d = cls.get_batch_assembler().assemble(d)
+			return track(d, g.num_vertices()) if connectivity else d
+
+class ElementaryMarkovDiagram(MarkovDiagram):
+	# Keys of the productions of a vertex and of an edge, and of the gluings of their ends
+	vertex_key = "V"
+	edge_key = "E"
+	left_key = "L"
+	right_key = "R"
+
+	@classmethod
+	def get_vertex_production(cls):
+		return cls.get_productions()[cls.vertex_key]
+
+	@classmethod
+	def get_edge_production(cls):
+		return cls.get_productions()[cls.edge_key]
+
+	@classmethod
+	def decompose(cls, g):
+		"""Create assembly graph and lower charts for given bottom graph"""
+		d = Decomposition(cls)
+		d.bottom_graph = g
+
+		# Create assembly graph and lower charts
+		ag = Graph()
+		productions = ag.new_vertex_property("string")
+		gluings = ag.new_edge_property("string")
+		lower_chart = dict()
+		inverse_lower_chart = dict()
+
+		ag.vertex_properties["productions"] = productions
+		ag.edge_properties["gluings"] = gluings
+
+		for v in g.vertices():
+			w = ag.add_vertex()
+			inverse_lower_chart[v] = w
+			productions[w] = cls.vertex_key
+
+			lower_chart[w] = Map(cls.get_vertex_production().get_bottom(), g)
+			lower_chart[w][cls.get_vertex_production().get_bottom().get_vertices()[0]] = v
+
+		for e in g.edges():
+			w = ag.add_vertex()
+
+			agv_s = inverse_lower_chart[e.source()]
+			agv_t = inverse_lower_chart[e.target()]
+
+			productions[w] = cls.edge_key
+
+			f = ag.add_edge(agv_s, w)
+			gluings[f] = cls.left_key
+			f = ag.add_edge(agv_t, w)
+			gluings[f] = cls.right_key
+
+			bottom_production_vertex = cls.get_vertex_production().get_bottom().get_vertices()[0]
+
+			edge = cls.get_edge_production().get_bottom()
+			left_vertex = cls.get_gluings()[cls.left_key].get_bottom_glue()[bottom_production_vertex]
+			right_vertex = cls.get_gluings()[cls.right_key].get_bottom_glue()[bottom_production_vertex]
+
+			lower_chart[w] = Map(edge, g)
+			lower_chart[w][left_vertex] = lower_chart[agv_s][bottom_production_vertex]
+			lower_chart[w][right_vertex] = lower_chart[agv_t][bottom_production_vertex]
+
+		d.assembly_graph = ag
+		d.lower_chart = lower_chart
+		d.upper_chart = None
+
+		return d
+
+	@classmethod
+	def get_assembler(cls):
+		if cls.__dict__.get("assembler") is None:
+			cls.assembler = ElementaryAssembler(cls)
+		return cls.assembler
+
+	@classmethod
+	def assemble(cls, g, processes = None, connectivity = False):
+		"""Same as decompose(g) followed by Decomposition.assemble(), without building assembly graph and charts;
+		processes > 1 assembles parts of g in a process pool, connectivity=True counts components from the assembled edges"""
+		with span("assemble", diagram=cls.__name__, vertices=g.num_vertices()):
+			return cls.get_assembler().assemble(g, processes, connectivity)
+
+	@classmethod
+	def sweep_layouts(cls, candidates, g = None):
+		"""Pick layout parameters level by level.
+
+		candidates[i] is a batch of (d1, d2) pairs for level i + 1. All of them are scored with layout_scores;
+		the candidate with fewest estimated crossings (ties broken by largest vertex separation) lays out the
+		level that the next one is assembled from. Returns list of (decomposition, positions, scores, best)."""
+		if g is None:
+			g = cls.get_starting_graph()
+
+		result = []
+		for batch in candidates:
+			d = cls.assemble(g)
+			batch = np.asarray(batch, dtype=float).reshape(-1, 2, 2)
+			positions = d.layout_batch(batch)
+			scores = layout_scores(positions, d.upper_graph.get_edges()[:, :2])
+			best = np.lexsort((-scores["min_separation"], scores["crossings"]))[0]
+			d.layout(batch[best][0], batch[best][1])
+			result.append((d, positions, scores, best))
+			g = d.upper_graph
+		return result
@@ -0,0 +1,582 @@
+# -*- coding: utf-8 -*-
+"""Markov diagrams of the papers: Nobeling, Menger "18", Diamond, Cantor and Cantor join sequences, and an edge
+subdivision diagram that is not elementary (used by the engine checks).
+
+Definitions are initialized on first use."""
+
+from graph_tool.all import Graph
+import numpy as np
+
+from .decomposition import Decomposition
+from .diagram import Production, Gluing, ElementaryMarkovDiagram, MarkovDiagram
+from .maps import Map
+
+##########################################################################################################################
+# Nobeling n=1, kappa=3
+##########################################################################################################################
+
+class NobelingPoint(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph()
+		a, b, c = top.add_vertex(), top.add_vertex(), top.add_vertex()
+		top.add_edge(a, b)
+		top.add_edge(b, c)
+		top.add_edge(a, c)
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (-0,0)
+		pos[b] = (1,0.2)
+		pos[c] = (0.8, 0.6)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph()
+		A = bot.add_vertex()
+		pos = bot.new_vertex_property("vector<double>")
+		pos[A] = (0, 0)
+		bot.vp["pos"] = pos
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+		cls.bonding_map[b] = A
+		cls.bonding_map[c] = A
+
+class NobelingEdge(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph()
+		a, b, c, d, e, f = top.add_vertex(), top.add_vertex(), top.add_vertex(), top.add_vertex(), top.add_vertex(), top.add_vertex()
+		top.add_edge_list([(a,b), (b,c), (a,c), (d,e), (d,f), (e,f), (a,d), (a,e), (a,f), (b,d), (b,e), (b,f), (c,d), (c,e), (c,f)])
+
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (-1,0)
+		pos[b] = (0,0.2)
+		pos[c] = (-0.2, 0.6)
+		pos[d] = (1,0)
+		pos[e] = (2,0.2)
+		pos[f] = (1.8, 0.6)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph()
+		A,B = bot.add_vertex(), bot.add_vertex()
+		pos = bot.new_vertex_property("vector<double>")
+		pos[A] = (-1, 0)
+		pos[B] = (1, 0)
+		bot.vp["pos"] = pos
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+		cls.bonding_map[b] = A
+		cls.bonding_map[c] = A
+		cls.bonding_map[d] = B
+		cls.bonding_map[e] = B
+		cls.bonding_map[f] = B
+
+class NobelingGluing_Left(Gluing):
+	@classmethod
+	def init(cls):
+		g1 = NobelingPoint.get_top()
+		g2 = NobelingEdge.get_top()
+
+		cls.top_glue = tg = Map(g1, g2)
+		tg[g1.get_vertices()[0]] = g2.get_vertices()[0]
+		tg[g1.get_vertices()[1]] = g2.get_vertices()[1]
+		tg[g1.get_vertices()[2]] = g2.get_vertices()[2]
+
+		g1 = NobelingPoint.get_bottom()
+		g2 = NobelingEdge.get_bottom()
+		cls.bottom_glue = bg = Map(g1, g2)
+		bg[g1.get_vertices()[0]] = g2.get_vertices()[0]
+
+class NobelingGluing_Right(Gluing):
+	@classmethod
+	def init(cls):
+		g1 = NobelingPoint.get_top()
+		g2 = NobelingEdge.get_top()
+
+		cls.top_glue = tg = Map(g1, g2)
+		tg[g1.get_vertices()[0]] = g2.get_vertices()[3]
+		tg[g1.get_vertices()[1]] = g2.get_vertices()[4]
+		tg[g1.get_vertices()[2]] = g2.get_vertices()[5]
+
+		g1 = NobelingPoint.get_bottom()
+		g2 = NobelingEdge.get_bottom()
+		cls.bottom_glue = bg = Map(g1, g2)
+		bg[g1.get_vertices()[0]] = g2.get_vertices()[1]
+
+class NobelingDiagram(ElementaryMarkovDiagram):
+	@classmethod
+	def init(cls):
+		cls.starting_graph = g = Graph(directed=False)
+		pos = g.new_vertex_property("vector<double>")
+		a=g.add_vertex()
+		pos[a] = (0,1)
+		b=g.add_vertex()
+		pos[b] = (0,-1)
+		g.add_edge(a,b)
+		g.vp["pos"] = pos
+
+		cls.productions = {
+			"V": NobelingPoint,
+			"E": NobelingEdge
+		}
+		cls.gluings = {
+		 	"L": NobelingGluing_Left, 
+			"R": NobelingGluing_Right
+		}
+
+
+##########################################################################################################################
+# Menger Curve "18" Sequence
+##########################################################################################################################
+
+class Production_1(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph()
+		a, b = top.add_vertex(), top.add_vertex()
+		top.add_edge(a, b)
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (-1,0)
+		pos[b] = (1,0)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph()
+		A = bot.add_vertex()
+		pos = bot.new_vertex_property("vector<double>")
+		pos[A] = (0, 0)
+		bot.vp["pos"] = pos
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+		cls.bonding_map[b] = A
+
+class Production_8(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph()
+		a,b,c,d,e,f = top.add_vertex(), top.add_vertex(), top.add_vertex(), top.add_vertex(), top.add_vertex(), top.add_vertex()
+		top.add_edge_list([(a,b), (e,f), (a,c), (b,d), (c,d), (c,e), (d,f) ])
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (-1, -1)
+		pos[b] = (1, -1)
+		pos[c] = (-1, 0)
+		pos[d] = (1, 0)
+		pos[e] = (-1,1)
+		pos[f] = (1,1)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph()
+		A, B = bot.add_vertex(), bot.add_vertex()
+		bot.add_edge(A, B)
+		pos = bot.new_vertex_property("vector<double>")
+		pos[A] = (0, 0)
+		pos[B] = (1, 0)
+		bot.vp["pos"] = pos
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+		cls.bonding_map[b] = A
+		cls.bonding_map[c] = [A, B]
+		cls.bonding_map[d] = [A, B]
+		cls.bonding_map[e] = B
+		cls.bonding_map[f] = B
+
+class Gluing_18_Left(Gluing):
+	@classmethod
+	def init(cls):
+		g1 = Production_1.get_top()
+		g2 = Production_8.get_top()
+
+		cls.top_glue = tg = Map(g1, g2)
+		tg[g1.get_vertices()[0]] = g2.get_vertices()[0]
+		tg[g1.get_vertices()[1]] = g2.get_vertices()[1]
+
+		g1 = Production_1.get_bottom()
+		g2 = Production_8.get_bottom()
+		cls.bottom_glue = bg = Map(g1, g2)
+		bg[g1.get_vertices()[0]] = g2.get_vertices()[0]
+
+class Gluing_18_Right(Gluing):
+	@classmethod
+	def init(cls):
+		g1 = Production_1.get_top()
+		g2 = Production_8.get_top()
+
+		cls.top_glue = tg = Map(g1, g2)
+		tg[g1.get_vertices()[0]] = g2.get_vertices()[4]
+		tg[g1.get_vertices()[1]] = g2.get_vertices()[5]
+
+		g1 = Production_1.get_bottom()
+		g2 = Production_8.get_bottom()
+		cls.bottom_glue = bg = Map(g1, g2)
+		bg[g1.get_vertices()[0]] = g2.get_vertices()[1]
+
+class Menger18Diagram(ElementaryMarkovDiagram):
+	@classmethod
+	def init(cls):
+		cls.starting_graph = g = Graph(directed=False)
+		pos = g.new_vertex_property("vector<double>")
+		a=g.add_vertex()
+		pos[a] = (-1,0)
+		b=g.add_vertex()
+		pos[b] = (1,0)
+		g.add_edge(a,b)
+		g.vp["pos"] = pos
+
+		cls.productions = {
+			"V": Production_1,
+			"E": Production_8
+		}
+		cls.gluings = {
+		 	"L": Gluing_18_Left, 
+			"R": Gluing_18_Right
+		}
+
+##########################################################################################################################
+# Diamond curve
+##########################################################################################################################
+
+class Production_Diamond(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph()
+		a, b, c, d = top.add_vertex(), top.add_vertex(), top.add_vertex(), top.add_vertex()
+		top.add_edge_list([(a, b), (a,c), (b,d), (c,d)])
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (0, 1)
+		pos[b] = (-1, 0)
+		pos[c] = (1, 0)
+		pos[d] = (0, -1)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph()
+		A = bot.add_vertex()
+		B = bot.add_vertex()
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+		cls.bonding_map[b] = [A,B]
+		cls.bonding_map[c] = [A,B]
+		cls.bonding_map[d] = B
+
+class Production_VertexID(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph()
+		a = top.add_vertex()
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (0, 0)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph()
+		A = bot.add_vertex()
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+
+class Gluing_Diamond_Left(Gluing):
+	@classmethod
+	def init(cls):
+		g1 = Production_VertexID.get_top()
+		g2 = Production_Diamond.get_top()
+
+		cls.top_glue = tg = Map(g1, g2)
+		tg[g1.get_vertices()[0]] = g2.get_vertices()[0]
+
+		g1 = Production_VertexID.get_bottom()
+		g2 = Production_Diamond.get_bottom()
+		cls.bottom_glue = bg = Map(g1, g2)
+		bg[g1.get_vertices()[0]] = g2.get_vertices()[0]
+
+class Gluing_Diamond_Right(Gluing):
+	@classmethod
+	def init(cls):
+		g1 = Production_VertexID.get_top()
+		g2 = Production_Diamond.get_top()
+
+		cls.top_glue = tg = Map(g1, g2)
+		tg[g1.get_vertices()[0]] = g2.get_vertices()[3]
+
+		g1 = Production_VertexID.get_bottom()
+		g2 = Production_Diamond.get_bottom()
+		cls.bottom_glue = bg = Map(g1, g2)
+		bg[g1.get_vertices()[0]] = g2.get_vertices()[1]
+
+class DiamondDiagram(ElementaryMarkovDiagram):
+	@classmethod
+	def init(cls):
+		cls.starting_graph = g = Graph(directed=False)
+		a, b = g.add_vertex(), g.add_vertex()
+		g.add_edge(a,b)
+
+		pos = g.new_vertex_property("vector<double>")
+		pos[a] = (0, -1)
+		pos[b] = (0, 1)
+		g.vp["pos"] = pos
+
+		cls.productions = {
+			"V": Production_VertexID,
+			"E": Production_Diamond
+		}
+		cls.gluings = {
+		 	"L": Gluing_Diamond_Left, 
+			"R": Gluing_Diamond_Right
+		}
+
+##########################################################################################################################
+# Cantor Set
+##########################################################################################################################
+
+class DoubleVertex(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph(directed=False)
+		a, b = top.add_vertex(), top.add_vertex()
+
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (0, -1)
+		pos[b] = (0, 1)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph(directed=False)
+		A = bot.add_vertex()
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+		cls.bonding_map[b] = A
+
+class CantorDiagram(ElementaryMarkovDiagram):
+	@classmethod
+	def init(cls):
+		cls.starting_graph = g = Graph()
+		a = g.add_vertex()
+		pos = g.new_vertex_property("vector<double>")
+		pos[a] = (0, 0)
+		g.vp["pos"] = pos
+
+		cls.productions = {
+			"V": DoubleVertex,
+			"E": None
+		}
+		cls.gluings = {
+		 	"L": None, 
+			"R": None
+		}
+
+##########################################################################################################################
+# Join of two Cantor Sets
+##########################################################################################################################
+
+class XtoI(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph(directed=False)
+		a, b, c, d = top.add_vertex(), top.add_vertex(), top.add_vertex(), top.add_vertex()
+		#top.add_edge_list([(a, d), (a,c), (b,c), (b,d)])
+		top.add_edge_list([(a,b),(c,d), (a,d), (b,c)])
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (0, 1)
+		pos[b] = (1, 1)
+		pos[c] = (0, 0)
+		pos[d] = (1, 0)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph(directed=False)
+		A = bot.add_vertex()
+		B = bot.add_vertex()
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+		cls.bonding_map[b] = A
+		cls.bonding_map[c] = B
+		cls.bonding_map[d] = B
+
+class Gluing_Join_Left(Gluing):
+	@classmethod
+	def init(cls):
+		g1 = DoubleVertex.get_top()
+		g2 = XtoI.get_top()
+
+		cls.top_glue = tg = Map(g1, g2)
+		tg[g1.get_vertices()[0]] = g2.get_vertices()[0]
+		tg[g1.get_vertices()[1]] = g2.get_vertices()[2]
+
+		g1 = DoubleVertex.get_bottom()
+		g2 = XtoI.get_bottom()
+		cls.bottom_glue = bg = Map(g1, g2)
+		bg[g1.get_vertices()[0]] = g2.get_vertices()[0]
+
+class Gluing_Join_Right(Gluing):
+	@classmethod
+	def init(cls):
+		g1 = DoubleVertex.get_top()
+		g2 = XtoI.get_top()
+
+		cls.top_glue = tg = Map(g1, g2)
+		tg[g1.get_vertices()[0]] = g2.get_vertices()[1]
+		tg[g1.get_vertices()[1]] = g2.get_vertices()[3]
+
+		g1 = DoubleVertex.get_bottom()
+		g2 = XtoI.get_bottom()
+		cls.bottom_glue = bg = Map(g1, g2)
+		bg[g1.get_vertices()[0]] = g2.get_vertices()[0]
+
+class CantorJoinDiagram(ElementaryMarkovDiagram):
+	@classmethod
+	def init(cls):
+		cls.starting_graph = g = Graph(directed=False)
+		a,b = g.add_vertex(), g.add_vertex()
+		g.add_edge(a,b)
+		pos = g.new_vertex_property("vector<double>")
+		pos[a] = (0, 0)
+		pos[b] = (0, 1)
+		g.vp["pos"] = pos
+
+		cls.productions = {
+			"V": DoubleVertex,
+			"E": XtoI
+		}
+		cls.gluings = {
+		 	"L": Gluing_Join_Left, 
+			"R": Gluing_Join_Right
+		}
+
+##########################################################################################################################
+# Edge subdivision (not elementary: two vertex productions chosen by decompose)
+##########################################################################################################################
+
+class SubdivisionVertex(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph(directed=False)
+		a = top.add_vertex()
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (0, 0)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph(directed=False)
+		A = bot.add_vertex()
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+
+class SubdivisionOddVertex(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph(directed=False)
+		a = top.add_vertex()
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (0, -0.2)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph(directed=False)
+		A = bot.add_vertex()
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+
+class SubdivisionEdge(Production):
+	@classmethod
+	def init(cls):
+		cls.top = top = Graph(directed=False)
+		a, m, b = top.add_vertex(), top.add_vertex(), top.add_vertex()
+		top.add_edge_list([(a, m), (m, b)])
+		pos = top.new_vertex_property("vector<double>")
+		pos[a] = (0, 0)
+		pos[m] = (0, 0.3)
+		pos[b] = (0, 0)
+		top.vp["pos"] = pos
+
+		cls.bottom = bot = Graph(directed=False)
+		A, B = bot.add_vertex(), bot.add_vertex()
+		bot.add_edge(A, B)
+
+		cls.bonding_map = Map(top, bot)
+		cls.bonding_map[a] = A
+		cls.bonding_map[m] = [A, B]
+		cls.bonding_map[b] = B
+
+def subdivision_gluing(vertex, side):
+	"""Gluing of the vertex production onto end side (0 or 1) of SubdivisionEdge"""
+	class SubdivisionGluing(Gluing):
+		@classmethod
+		def init(cls):
+			g1, g2 = vertex.get_top(), SubdivisionEdge.get_top()
+			cls.top_glue = tg = Map(g1, g2)
+			tg[g1.get_vertices()[0]] = g2.get_vertices()[2 * side]
+
+			g1, g2 = vertex.get_bottom(), SubdivisionEdge.get_bottom()
+			cls.bottom_glue = bg = Map(g1, g2)
+			bg[g1.get_vertices()[0]] = g2.get_vertices()[side]
+	return SubdivisionGluing
+
+class SubdivisionDiagram(MarkovDiagram):
+	"""Every edge subdivided in two; vertices of odd degree get their own production. Small enough for
+	checks of the general assembly engine, which is all it is used for."""
+
+	@classmethod
+	def init(cls):
+		cls.starting_graph = g = Graph(directed=False)
+		a, b, c, d = g.add_vertex(), g.add_vertex(), g.add_vertex(), g.add_vertex()
+		g.add_edge_list([(a, b), (b, c), (c, a), (c, d)])
+		pos = g.new_vertex_property("vector<double>")
+		pos[a] = (0, 0)
+		pos[b] = (1, 0)
+		pos[c] = (0.5, 0.8)
+		pos[d] = (0.5, 1.8)
+		g.vp["pos"] = pos
+
+		cls.productions = {
+			"V": SubdivisionVertex,
+			"O": SubdivisionOddVertex,
+			"E": SubdivisionEdge
+		}
+		cls.gluings = dict((key + side, subdivision_gluing(cls.productions[key], i)) for key in "VO" for i, side in enumerate("LR"))
+
+	@classmethod
+	def decompose(cls, g):
+		d = Decomposition(cls)
+		d.bottom_graph = g
+
+		ag = Graph()
+		productions = ag.new_vertex_property("string")
+		gluings = ag.new_edge_property("string")
+		ag.vertex_properties["productions"] = productions
+		ag.edge_properties["gluings"] = gluings
+		lower_chart = dict()
+
+		edges = g.get_edges()[:, :2]
+		vertices = []
+		degrees = np.bincount(edges.ravel(), minlength=g.num_vertices())
+		for v, degree in enumerate(degrees.tolist()):
+			w = ag.add_vertex()
+			vertices.append(w)
+			productions[w] = "O" if degree % 2 else "V"
+			lower_chart[w] = Map(cls.get_productions()[productions[w]].get_bottom(), g)
+			lower_chart[w][0] = v
+
+		for s, t in edges.tolist():
+			w = ag.add_vertex()
+			productions[w] = "E"
+			for side, v in zip("LR", (s, t)):
+				e = ag.add_edge(vertices[v], w)
+				gluings[e] = productions[vertices[v]] + side
+			lower_chart[w] = Map(SubdivisionEdge.get_bottom(), g)
+			lower_chart[w][0] = s
+			lower_chart[w][1] = t
+
+		d.assembly_graph = ag
+		d.lower_chart = lower_chart
+		d.upper_chart = None
+		return d
+
+DIAGRAMS = {
+	"cantor": CantorDiagram,
+	"cantor_join": CantorJoinDiagram,
+	"menger": Menger18Diagram,
+	"diamond": DiamondDiagram,
+	"nobeling": NobelingDiagram
+}
+
+def get_diagram(name):
+	"""Diagram class registered under given name, initialized"""
+	return DIAGRAMS[name].initialize()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Figures of the papers: draw jobs for selected levels of each diagram, yielded as soon as a level is laid out"""
+
+import math
+
+from .diagrams import CantorDiagram, CantorJoinDiagram, Menger18Diagram, DiamondDiagram, NobelingDiagram
+from .layout import warm_layouts
+from .maps import position_array
+from .render import draw_job
+from .sequence import MarkovSequence
+
+def select(levels, n):
+	"""Requested levels that the figure has (all of 0, ..., n - 1 if levels is None)"""
+	if levels is None:
+		return list(range(n))
+	return sorted(set(i for i in levels if 0 <= i < n))
+
+def generate_Cantor_diagram(w, h, levels = None, variants = ("fixed",), cache = None, checkpoint = None, from_level = None):
+	n = 6
+	m = [ 1.0, 0.4, 0.4 * 0.4, 0.4 * 0.4 * 0.4, 0.4 * 0.4 * 0.4 * 0.3, 0.4 * 0.4 * 0.4 * 0.3 * 0.3 ]
+	layouts = [((0,m[i]), (0,m[i])) for i in range(n)]
+	levels = select(levels, n)
+
+	if not levels or "fixed" not in variants:
+		return
+	for i, g in MarkovSequence(CantorDiagram, levels[-1], layouts, cache=cache, checkpoint=checkpoint, from_level=from_level):
+		if i not in levels:
+			continue
+
+		size = 16
+		if i == 5:
+			size = 12
+
+		pos = position_array(g)
+		pos[:, 0] = w/2
+		pos[:, 1] = pos[:, 1] * h/3.34 + h/2
+
+		yield draw_job(g, pos, "diagrams/cantor_"+str(i)+".png", vertex_size=size, vertex_color=[0., 0., 0., 1.], vertex_fill_color=[0., 0., 0., 1.], output_size=(w,h), fit_view=False)
+
+def generate_CantorJoin_diagram(w, h, levels = None, variants = ("fixed",), cache = None, checkpoint = None, from_level = None):
+	n = 6
+	m = [ 1.0, 0.4, 0.4 * 0.4, 0.4 * 0.4 * 0.4, 0.4 * 0.4 * 0.4 * 0.3, 0.4 * 0.4 * 0.4 * 0.3 * 0.3 ]
+	sz = [ 0.02, 0.02, 0.015, 0.015, 0.002, 0.001 ]
+	layouts = [((m[i],0), (m[i],0)) for i in range(n)]
+	levels = select(levels, n)
+
+	if not levels or "fixed" not in variants:
+		return
+	for i, g in MarkovSequence(CantorJoinDiagram, levels[-1], layouts, cache=cache, checkpoint=checkpoint, from_level=from_level):
+		if i not in levels:
+			continue
+
+		pos = position_array(g) * (w/3.34, h/3.34) + (w/2, h/2)
+
+		yield draw_job(g, pos, "diagrams/cantor_join_"+str(i)+".png", vertex_size=sz[i] * w, vertex_color=[0., 0., 0., 1.], vertex_fill_color=[0., 0., 0., 1.], output_size=(w,h), fit_view=False)
+
+def generate_Menger18_diagram(w, h, levels = None, variants = ("fixed",), cache = None, checkpoint = None, from_level = None):
+	n = 5
+	m = [ 1.0, 0.4, 0.4 * 0.4, 0.4 * 0.4 * 0.3, 0.4 * 0.4 * 0.3 * 0.3, 0.4 * 0.4 * 0.3 * 0.3 * 0.3 ]
+	dr = [ [0,1], [2,3], [1,4], [-1, 3], [-3,2]]
+	sz = [ 0.02, 0.02, 0.015, 0.015, 0.01, 0.005 ]
+	levels = select(levels, n + 1)
+
+	layouts = []
+	for i in range(n):
+		z = dr[i]
+		zn = math.sqrt(z[0]*z[0] + z[1]*z[1])
+		z = [z[0]/zn * m[i], z[1]/zn * m[i]]
+		layouts.append((z, z))
+
+	if not levels or "fixed" not in variants:
+		return
+	for i, g in MarkovSequence(Menger18Diagram, levels[-1], layouts, cache=cache, checkpoint=checkpoint, from_level=from_level):
+		if i not in levels:
+			continue
+
+		pos = position_array(g) * (w/3.34, h/3.34) + (w/2, h/2)
+
+		yield draw_job(g, pos, "diagrams/menger_"+str(i)+".png", edge_pen_width=sz[i] * w * 0.4, vertex_size=sz[i] * w, vertex_color=[0., 0., 0., 1.], vertex_fill_color=[0., 0., 0., 1.], output_size=(w,h), fit_view=False)
+
+def generate_Diamond_diagram(w, h, levels = None, variants = ("fixed", "sfdp"), cache = None, checkpoint = None, from_level = None):
+	n = 5
+	m = [ 1.0, 0.2, 0.2 * 0.2, 0.2 * 0.2 * 0.2, 0.2 * 0.2 * 0.2 * 0.2, 0.2 * 0.2 * 0.2 * 0.2 * 0.2 ]
+	sz = [ 0.02, 0.02, 0.02, 0.015, 0.01, 0.02 ]
+	layouts = [([m[i], 0], [m[i], 0]) for i in range(n)]
+	levels = select(levels, n + 1)
+
+	if not levels:
+		return
+	sequence = MarkovSequence(DiamondDiagram, levels[-1], layouts, cache=cache, checkpoint=checkpoint, from_level=from_level)
+	if "warm" in variants:
+		sequence = warm_layouts(sequence)
+	else:
+		sequence = ((i, g, None, None) for i, g in sequence)
+	for i, g, warm, _ in sequence:
+		if i not in levels:
+			continue
+
+		style = dict(edge_pen_width=sz[i] * w * 0.4, vertex_size=sz[i] * w, vertex_color=[0., 0., 0., 1.], vertex_fill_color=[0., 0., 0., 1.], output_size=(w,h))
+
+		if "fixed" in variants:
+			pos = position_array(g) * (w/3.34, h/3.34) + (w/2, h/2)
+			yield draw_job(g, pos, "diagrams/diamond_"+str(i)+".png", fit_view=False, **style)
+		if "sfdp" in variants:
+			yield draw_job(g, None, "diagrams/diamond_sfdp_"+str(i)+".png", layout="sfdp", fit_view=True, **style)
+		if "warm" in variants:
+			yield draw_job(g, warm, "diagrams/diamond_sfdp_"+str(i)+".png", fit_view=True, **style)
+
+def generate_Nobeling_diagram(w, h, levels = None, variants = ("fixed", "sfdp"), cache = None, checkpoint = None, from_level = None):
+	n = 3
+	m = [ 1.0, 0.4, 0.4 * 0.4, 0.4 * 0.4 * 0.4, 0.4 * 0.4 * 0.4 * 0.3, 0.4 * 0.4 * 0.4 * 0.3 * 0.3 ]
+	sz = [ 0.01, 0.01, 0.01, 0.01, 0.01, 0.01 ]
+	lay = [ [(1.0, 0.0), (0.0, 0.8)], [(1.0, 0.0), (0.0, 0.8)], [(0.0, 1.0), (0.8, 0.0)] ]
+	layouts = [((lay[i][0][0]*m[i],lay[i][0][1]*m[i]), (lay[i][1][0]*m[i],lay[i][1][1]*m[i])) for i in range(n)]
+	levels = select(levels, n)
+
+	if not levels:
+		return
+	sequence = MarkovSequence(NobelingDiagram, levels[-1], layouts, cache=cache, checkpoint=checkpoint, from_level=from_level)
+	if "warm" in variants:
+		sequence = warm_layouts(sequence)
+	else:
+		sequence = ((i, g, None, None) for i, g in sequence)
+	for i, g, warm, _ in sequence:
+		if i not in levels:
+			continue
+
+		style = dict(edge_pen_width=sz[i] * w * 0.2, vertex_size=sz[i] * w, vertex_color=[0., 0., 0., 1.], vertex_fill_color=[0., 0., 0., 1.], output_size=(w,h), fit_view=True)
+
+		if "fixed" in variants:
+			pos = position_array(g) * (w/3.34, h/3.34) + (w/2, h/2)
+			yield draw_job(g, pos, "diagrams/nobeling_"+str(i)+".png", edge_color=[0., 0., 0., 1.], **style)
+		if "sfdp" in variants:
+			yield draw_job(g, None, "diagrams/nobeling_sfdp_"+str(i)+".png", layout="sfdp", **style)
+		if "warm" in variants:
+			yield draw_job(g, warm, "diagrams/nobeling_sfdp_"+str(i)+".png", **style)
+
+# Figure name -> (generator, output size, number of levels)
+FIGURES = {
+	"cantor_join": (generate_CantorJoin_diagram, (1000, 1000), 6),
+	"cantor": (generate_Cantor_diagram, (40, 1600), 6),
+	"menger": (generate_Menger18_diagram, (1000, 1000), 6),
+	"diamond": (generate_Diamond_diagram, (1000, 1000), 6),
+	"nobeling": (generate_Nobeling_diagram, (2000, 2000), 3)
+}
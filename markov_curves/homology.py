@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""First homology of levels and ranks of maps induced on it by bonding maps, by sparse linear algebra.
+
+Levels are graphs, so H1 is the cycle space Z1 = ker ∂ and b1 = E - V + (number of components) over any
+field. A bonding map sends a vertex either to a vertex or to the midpoint of an edge; it is replaced by
+the homotopic simplicial map sending a midpoint image to the first end of its edge, so that every upper
+edge goes to a bottom edge or collapses to a vertex. The rank of the induced map is then
+rank [∂; M] - rank ∂ for the chain map M on edges.
+
+Ranks are computed over GF(2) (p = 2) or over Q, the latter modulo the prime PRIME, which agrees with
+the rational rank unless PRIME divides some minor of the (0, ±1) matrix."""
+
+import numpy as np
+
+from .connectivity import UnionFind, components
+
+PRIME = 2147483647
+
+def boundary_matrix(n, edges):
+	"""Sparse (n, m) boundary matrix of a graph with n vertices: column of edge (s, t) is t - s"""
+	from scipy.sparse import coo_matrix
+	m = len(edges)
+	rows = np.concatenate((edges[:, 0], edges[:, 1]))
+	columns = np.concatenate((np.arange(m), np.arange(m)))
+	values = np.concatenate((-np.ones(m, dtype=np.int64), np.ones(m, dtype=np.int64)))
+	return coo_matrix((values, (rows, columns)), shape=(n, m)).tocsc()
+
+def edge_images(edges, nb, bottom_edges, f):
+	"""Index of the bottom edge every upper edge is sent to (-1 for collapsed edges) and the sign of the
+	image relative to the orientation of the bottom edge; f is the bonding map of the upper vertices"""
+	a, b = f[edges[:, 0], 0].astype(np.int64), f[edges[:, 1], 0].astype(np.int64)
+	key = np.minimum(bottom_edges[:, 0], bottom_edges[:, 1]) * nb + np.maximum(bottom_edges[:, 0], bottom_edges[:, 1])
+	order = np.argsort(key)
+	image = np.minimum(a, b) * nb + np.maximum(a, b)
+
+	h = np.full(len(edges), -1, dtype=np.int64)
+	if len(key):
+		h = order[np.minimum(np.searchsorted(key, image, sorter=order), len(key) - 1)]
+		h[key[h] != image] = -1
+	missing = (h < 0) & (a != b)
+	if np.any(missing):
+		raise ValueError("Edge (%d, %d) is not mapped to an edge or a vertex" % tuple(edges[np.flatnonzero(missing)[0]]))
+
+	h[a == b] = -1
+	sign = np.where(bottom_edges[np.maximum(h, 0), 0] == a, 1, -1) if len(key) else np.ones(len(edges), dtype=np.int64)
+	return h, sign
+
+def chain_map(edges, nb, bottom_edges, f):
+	"""Sparse (bottom edges, upper edges) matrix of the map induced on edges; collapsed edges give zero columns"""
+	from scipy.sparse import coo_matrix
+	h, sign = edge_images(edges, nb, bottom_edges, f)
+	kept = h >= 0
+	return coo_matrix((sign[kept], (h[kept], np.flatnonzero(kept))), shape=(len(bottom_edges), len(edges))).tocsc()
+
+def rank(matrix, p = 2):
+	"""Rank of a sparse integer matrix over GF(p) by column elimination; for p = 2 columns are bitsets"""
+	a = matrix.tocsc()
+	a.sum_duplicates()
+	pivots = {}
+	r = 0
+	for j in range(a.shape[1]):
+		rows = a.indices[a.indptr[j]:a.indptr[j + 1]]
+		values = a.data[a.indptr[j]:a.indptr[j + 1]] % p
+		if p == 2:
+			column = 0
+			for i in rows[values != 0]:
+				column |= 1 << int(i)
+			while column:
+				other = pivots.get(column.bit_length() - 1)
+				if other is None:
+					pivots[column.bit_length() - 1] = column
+					r += 1
+					break
+				column ^= other
+		else:
+			column = dict((int(i), int(v)) for i, v in zip(rows, values) if v)
+			while column:
+				low = max(column)
+				other = pivots.get(low)
+				if other is None:
+					inverse = pow(column[low], p - 2, p)
+					pivots[low] = dict((i, v * inverse % p) for i, v in column.items())
+					r += 1
+					break
+				c = column[low]
+				for i, v in other.items():
+					w = (column.get(i, 0) - c * v) % p
+					if w:
+						column[i] = w
+					else:
+						column.pop(i, None)
+	return r
+
+def betti_number(n, edges):
+	"""First Betti number of a graph with n vertices and (m, 2) edge array"""
+	return len(edges) - n + components(n, edges)
+
+def spanning_forest(n, edges):
+	"""Boolean mask of edges of a spanning forest (the first edge of every cycle is kept)"""
+	from scipy.sparse import coo_matrix
+	from scipy.sparse.csgraph import minimum_spanning_tree
+	forest = np.zeros(len(edges), dtype=bool)
+	if not len(edges):
+		return forest
+	weights = np.arange(1, len(edges) + 1, dtype=np.float64)
+	tree = minimum_spanning_tree(coo_matrix((weights, (np.minimum(edges[:, 0], edges[:, 1]), np.maximum(edges[:, 0], edges[:, 1]))), shape=(n, n)))
+	forest[tree.tocoo().data.astype(np.int64) - 1] = True
+	return forest
+
+def induced_rank(n, edges, nb, bottom_edges, f, p = 2):
+	"""Rank over GF(p) of the map H1(upper) -> H1(bottom) induced by the bonding map f (first column).
+
+	H1(bottom) is identified with coordinates on edges outside of a spanning forest T. Upper edges sent
+	to T or collapsed do not change coordinates and are contracted first; the remaining (much smaller)
+	quotient graph Q gives rank [∂_Q; M_Q] - rank ∂_Q."""
+	from scipy.sparse import coo_matrix, vstack
+	h, sign = edge_images(edges, nb, bottom_edges, f)
+	tree = spanning_forest(nb, bottom_edges)
+	contracted = (h < 0) | tree[np.maximum(h, 0)]
+
+	uf = UnionFind(n)
+	uf.union(edges[contracted])
+	quotient = uf.roots()[edges[~contracted]]
+	h, sign = h[~contracted], sign[~contracted]
+	if not len(quotient):
+		return 0
+
+	vertices, quotient = np.unique(quotient, return_inverse=True)
+	quotient = quotient.reshape(-1, 2)
+	cycles, h = np.unique(h, return_inverse=True)
+	m = len(quotient)
+
+	boundary = boundary_matrix(len(vertices), quotient)
+	coordinates = coo_matrix((sign, (h, np.arange(m))), shape=(len(cycles), m)).tocsc()
+	return rank(vstack((boundary, coordinates)), p) - (len(vertices) - components(len(vertices), quotient))
+
+def cycle_ranks(cls, levels, p = 2, starting_graph = None):
+	"""First Betti numbers of levels 0, ..., levels of the sequence of an elementary diagram and ranks of
+	induced maps H1(level i) -> H1(level i - 1) over GF(p), as a list of dicts"""
+	from .sequence import MarkovSequence
+
+	result = []
+	bottom = None
+	sequence = MarkovSequence(cls, levels, starting_graph=starting_graph)
+	for i, g in sequence:
+		n, edges = g.num_vertices(), g.get_edges()[:, :2].astype(np.int64)
+		row = {"level": i, "vertices": n, "edges": len(edges), "betti": betti_number(n, edges), "rank": None}
+		if bottom is not None:
+			row["rank"] = induced_rank(n, edges, bottom[0], bottom[1], sequence.bonding_map[0], p)
+		result.append(row)
+		bottom = n, edges
+	return result
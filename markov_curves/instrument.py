@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Timing spans and counters for phases of assembly, layout and rendering, reported to pluggable sinks.
+
+Nothing is recorded unless a sink is installed: span() then returns a shared no-op context manager and
+count() returns after one test, so instrumentation can stay in production code. Spans nest within a
+thread; every span event carries the path of enclosing span names. Spans and counters of pool workers reach only sinks
+that write to files (they are copies of the sinks of the parent process)."""
+
+import json
+import threading
+import time
+
+SINKS = []
+LOCAL = threading.local()
+
+def stack():
+	"""Names of the open spans of the current thread"""
+	if not hasattr(LOCAL, "stack"):
+		LOCAL.stack = []
+	return LOCAL.stack
+
+class NullSpan(object):
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		return False
+
+NULL_SPAN = NullSpan()
+
+class Span(object):
+	def __init__(self, name, attributes):
+		self.name = name
+		self.attributes = attributes
+
+	def __enter__(self):
+		stack().append(self.name)
+		self.path = "/".join(stack())
+		self.start = time.time()
+		return self
+
+	def __exit__(self, *exc):
+		seconds = time.time() - self.start
+		stack().pop()
+		event = {"type": "span", "name": self.name, "path": self.path, "start": self.start, "seconds": seconds}
+		event.update(self.attributes)
+		for sink in SINKS:
+			sink.span(event)
+		return False
+
+def enabled():
+	return bool(SINKS)
+
+def span(name, **attributes):
+	"""Context manager timing a named phase, e.g. span("assemble", level=3)"""
+	if not SINKS:
+		return NULL_SPAN
+	return Span(name, attributes)
+
+def count(name, n = 1):
+	"""Add n to a named counter"""
+	if not SINKS:
+		return
+	for sink in SINKS:
+		sink.count(name, n)
+
+def install(sink):
+	SINKS.append(sink)
+	sink.start()
+	return sink
+
+def uninstall(sink):
+	SINKS.remove(sink)
+	sink.stop()
+
+class instrumented(object):
+	"""Context manager installing sinks for the duration of a block"""
+
+	def __init__(self, *sinks):
+		self.sinks = sinks
+
+	def __enter__(self):
+		for sink in self.sinks:
+			install(sink)
+		return self.sinks[0] if len(self.sinks) == 1 else self.sinks
+
+	def __exit__(self, *exc):
+		for sink in reversed(self.sinks):
+			uninstall(sink)
+		return False
+
+class Sink(object):
+	def start(self):
+		pass
+
+	def stop(self):
+		pass
+
+	def span(self, event):
+		pass
+
+	def count(self, name, n):
+		pass
+
+class MemorySink(Sink):
+	"""Keeps span events and counter totals; report() summarizes them by span path"""
+
+	def __init__(self):
+		self.events = []
+		self.counters = {}
+		self.lock = threading.Lock()
+
+	def span(self, event):
+		self.events.append(event)
+
+	def count(self, name, n):
+		with self.lock:
+			self.counters[name] = self.counters.get(name, 0) + n
+
+	def totals(self):
+		"""Dict path -> (calls, seconds)"""
+		totals = {}
+		for event in self.events:
+			calls, seconds = totals.get(event["path"], (0, 0.0))
+			totals[event["path"]] = (calls + 1, seconds + event["seconds"])
+		return totals
+
+	def report(self):
+		lines = ["%-40s %8s %12s" % ("span", "calls", "seconds")]
+		for path, (calls, seconds) in sorted(self.totals().items()):
+			lines.append("%-40s %8d %12.4f" % (path, calls, seconds))
+		if self.counters:
+			lines.append("")
+			lines.append("%-40s %21s" % ("counter", "total"))
+			for name in sorted(self.counters):
+				lines.append("%-40s %21d" % (name, self.counters[name]))
+		return "\n".join(lines)
+
+class JSONLinesSink(Sink):
+	"""Appends span events as JSON lines to a file, and counter totals as a last line when stopped"""
+
+	def __init__(self, path):
+		self.path = path
+		self.file = None
+		self.counters = {}
+		self.lock = threading.Lock()
+
+	def start(self):
+		self.file = open(self.path, "a")
+
+	def stop(self):
+		self.write({"type": "counters", "counters": self.counters})
+		self.file.close()
+		self.file = None
+
+	def write(self, event):
+		with self.lock:
+			self.file.write(json.dumps(event, default=str) + "\n")
+			self.file.flush()
+
+	def span(self, event):
+		self.write(event)
+
+	def count(self, name, n):
+		with self.lock:
+			self.counters[name] = self.counters.get(name, 0) + n
+
+class ProfileSink(Sink):
+	"""Runs cProfile and/or tracemalloc (Python 3) while installed; stats() returns pstats.Stats, memory_usage()
+	the (current, peak) traced bytes and output, if given, receives the profile on stop"""
+
+	def __init__(self, profile = True, memory = False, output = None):
+		self.profile = profile
+		self.memory = memory
+		self.output = output
+		self.profiler = None
+		self.traced = None
+
+	def start(self):
+		if self.memory:
+			import tracemalloc
+			tracemalloc.start()
+		if self.profile:
+			import cProfile
+			self.profiler = cProfile.Profile()
+			self.profiler.enable()
+
+	def stop(self):
+		if self.profiler is not None:
+			self.profiler.disable()
+			if self.output is not None:
+				self.profiler.dump_stats(self.output)
+		if self.memory:
+			import tracemalloc
+			self.traced = tracemalloc.get_traced_memory()
+			tracemalloc.stop()
+
+	def stats(self):
+		import pstats
+		return pstats.Stats(self.profiler)
+
+	def memory_usage(self):
+		if self.traced is not None:
+			return self.traced
+		import tracemalloc
+		return tracemalloc.get_traced_memory()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Scoring of candidate layouts and warm-started force-directed layouts"""
+
+import time
+
+import numpy as np
+
+from .instrument import span
+from .maps import anchor_array, position_array
+
+def layout_scores(positions, edges, samples = 20000, seed = 0):
+	"""Cheap quality scores of a batch of layouts given as (k, n, 2) positions of a graph with (m, 2) edges.
+
+	Returns dict with arrays of length k: "min_separation" is the smallest distance between two vertices and
+	"crossings" is the number of proper edge crossings, estimated from a fixed sample of edge pairs."""
+	from scipy.spatial import cKDTree
+
+	positions = np.asarray(positions, dtype=float)
+	k, n = positions.shape[0], positions.shape[1]
+
+	separation = np.full(k, np.inf)
+	if n > 1:
+		for j in range(k):
+			separation[j] = cKDTree(positions[j]).query(positions[j], k=2)[0][:, 1].min()
+
+	m = len(edges)
+	pairs = m * (m - 1) // 2
+	if pairs <= samples:
+		a, b = np.triu_indices(m, 1)
+	else:
+		rng = np.random.RandomState(seed)
+		a, b = rng.randint(0, m, samples), rng.randint(0, m, samples)
+
+	def orientation(p, q, r):
+		return np.sign((q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1]) - (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0]))
+
+	p1, p2 = positions[:, edges[a, 0]], positions[:, edges[a, 1]]
+	q1, q2 = positions[:, edges[b, 0]], positions[:, edges[b, 1]]
+	cross = (orientation(p1, p2, q1) * orientation(p1, p2, q2) < 0) & (orientation(q1, q2, p1) * orientation(q1, q2, p2) < 0)
+	crossings = cross.sum(axis=1) * (float(pairs) / max(len(a), 1))
+
+	return {"min_separation": separation, "crossings": crossings}
+
+def mean_edge_length(positions, edges):
+	if not len(edges):
+		return 1.0
+	return float(np.linalg.norm(positions[edges[:, 0]] - positions[edges[:, 1]], axis=1).mean()) or 1.0
+
+def sfdp_refine(g, positions, tol = 1e-3, chunk = 10, max_iter = 500, step = 0.1, **options):
+	"""Force-directed layout of g started from (n, 2) positions, without the multilevel coarsening.
+
+	sfdp runs in chunks of iterations until the mean displacement of a vertex during a chunk drops below
+	tol times the mean edge length, or max_iter iterations are done. The optimal edge length K (default: the
+	mean edge length of positions) and the step length carry over from chunk to chunk: the first chunk
+	starts at step times K and every iteration cools it by cooling_step, with adaptive cooling off, so that
+	later chunks do not heat the converging layout up again. Returns (n, 2) positions and a dict of
+	statistics: iterations, residuals and seconds (one per chunk), converged and seconds."""
+	from graph_tool.all import sfdp_layout
+
+	start = time.time()
+	edges = g.get_edges()[:, :2]
+	current = np.asarray(positions, dtype=float)
+	options.setdefault("K", mean_edge_length(current, edges))
+	options.setdefault("cooling_step", 0.95)
+	options["adaptive_cooling"] = False
+	init_step = options.pop("init_step", step * options["K"])
+
+	pos = g.new_vertex_property("vector<double>")
+	pos.set_2d_array(current.T)
+	stats = {"iterations": 0, "residuals": [], "chunk_seconds": [], "converged": False}
+	with span("sfdp", vertices=g.num_vertices()):
+		while stats["iterations"] < max_iter and g.num_vertices() > 1:
+			chunk_start = time.time()
+			pos = sfdp_layout(g, pos=pos, multilevel=False, max_iter=chunk, init_step=init_step, **options)
+			init_step *= options["cooling_step"]**chunk
+			stats["iterations"] += chunk
+			updated = pos.get_2d_array([0, 1]).T.copy()
+			residual = np.linalg.norm(updated - current, axis=1).mean() / mean_edge_length(updated, edges)
+			stats["residuals"].append(float(residual))
+			stats["chunk_seconds"].append(time.time() - chunk_start)
+			current = updated
+			if residual < tol:
+				stats["converged"] = True
+				break
+	stats["seconds"] = time.time() - start
+	return current, stats
+
+def warm_layouts(sequence, seed = "lift", scale = 0.25, tol = 1e-3, chunk = 10, max_iter = 500, step = 0.1, **options):
+	"""Yield (i, graph, (n, 2) positions, statistics) for levels of a MarkovSequence laid out by sfdp, each
+	level seeded from the one before.
+
+	The first level gets a full multilevel sfdp layout. With seed="lift" the converged positions of level i - 1
+	are lifted through the bonding map: every vertex starts at its bonding image shifted by its relative
+	position, scaled to scale times the mean edge length of level i - 1. With seed="layout" the solver
+	starts from the positions given by the layouts of the sequence (Decomposition.layout). Seeded levels are
+	refined by sfdp_refine with tol, chunk, max_iter and step."""
+	from graph_tool.all import sfdp_layout
+
+	previous = None
+	for i, g in sequence:
+		if previous is None and not (seed == "layout" and "pos" in g.vp):
+			start = time.time()
+			positions = sfdp_layout(g, **options).get_2d_array([0, 1]).T.copy()
+			stats = {"iterations": None, "residuals": [], "chunk_seconds": [], "converged": True, "seconds": time.time() - start}
+		else:
+			if seed == "layout":
+				initial = position_array(g)
+			elif seed == "lift":
+				f, mid = sequence.bonding_map
+				offset = scale * mean_edge_length(previous, previous_edges)
+				initial = anchor_array(f, mid, previous) + position_array(g, "relpos") * offset
+			else:
+				raise ValueError("Unknown seed " + str(seed))
+			positions, stats = sfdp_refine(g, initial, tol, chunk, max_iter, step, **options)
+
+		previous, previous_edges = positions, g.get_edges()[:, :2]
+		yield i, g, positions, stats
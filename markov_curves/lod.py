@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Level-of-detail rendering: draw a level with cairo after collapsing everything smaller than a pixel"""
+
+import numpy as np
+
+# Defaults of graph_draw, so that both renderers give the same picture for the same options
+VERTEX_SIZE = 5
+VERTEX_PEN_WIDTH = 0.8
+VERTEX_COLOR = (0.179, 0.203, 0.210, 0.8)
+VERTEX_FILL_COLOR = (0.640625, 0, 0, 0.9)
+EDGE_PEN_WIDTH = 1
+EDGE_COLOR = (0.179, 0.203, 0.210, 0.8)
+
+def fit(pos, size, margin):
+	"""Scale and translate (n, 2) positions to fill an image of given size with a margin, keeping aspect"""
+	w, h = size
+	if not len(pos):
+		return pos
+	lo, hi = pos.min(axis=0), pos.max(axis=0)
+	extent = np.maximum(hi - lo, 1e-12)
+	scale = min((w - 2 * margin) / extent[0], (h - 2 * margin) / extent[1])
+	return (pos - (lo + hi) / 2.0) * scale + (w / 2.0, h / 2.0)
+
+def cull(pos, edges, size, cell = 1.0, vertex_extent = 0.0, edge_extent = 0.0):
+	"""Collapse vertices lying in the same cell of a pixel grid and the edges between them.
+
+	Returns (k, 2) points (cell centres, in pixels), (l, 2) pairs of indices into points, one per visible
+	segment, and a mask of points to be drawn as vertices. Edges inside one cell and repeated segments are
+	dropped, as are points and segments that cannot touch the image: vertex_extent and edge_extent are
+	how far a vertex and a segment are drawn beyond their points (in pixels), so that a vertex or edge just
+	outside the image still shows at its border (and no seam appears between adjacent tiles)."""
+	w, h = size
+	cells = np.floor(pos / cell).astype(np.int64)
+	if len(cells):
+		cells -= cells.min(axis=0)
+	columns = int(cells[:, 0].max()) + 1 if len(cells) else 1
+
+	keys, first, vertex = np.unique(cells[:, 1] * columns + cells[:, 0], return_index=True, return_inverse=True)
+	centres = (np.floor(pos[first] / cell) + 0.5) * cell
+
+	def outside(margin):
+		return np.column_stack((centres[:, 0] < -margin, centres[:, 0] > w + margin, centres[:, 1] < -margin, centres[:, 1] > h + margin))
+	visible = ~outside(vertex_extent).any(axis=1)
+	side = outside(edge_extent)
+
+	segments = vertex[edges]
+	segments = segments[(segments[:, 0] != segments[:, 1]) & ~(side[segments[:, 0]] & side[segments[:, 1]]).any(axis=1)]
+	k = len(keys)
+	segment_keys = np.unique(np.minimum(segments[:, 0], segments[:, 1]) * k + np.maximum(segments[:, 0], segments[:, 1]))
+	segments = np.column_stack((segment_keys // k, segment_keys % k))
+	return centres, segments, visible
+
+def draw_lod(edges, pos, output, output_size = (600, 600), fit_view = True, vertex_size = VERTEX_SIZE, vertex_pen_width = VERTEX_PEN_WIDTH,
+		vertex_color = VERTEX_COLOR, vertex_fill_color = VERTEX_FILL_COLOR, edge_pen_width = EDGE_PEN_WIDTH, edge_color = EDGE_COLOR, **options):
+	"""Render a graph given by (m, 2) edges and (n, 2) positions to a PNG with cairo, with the options of
+	graph_draw used by the figures (others are ignored).
+
+	Positions are binned to pixels, so work after binning is bounded by the image resolution: all edges
+	are stroked as one path and all vertices filled as another."""
+	import cairo
+
+	w, h = output_size
+	pos = np.asarray(pos, dtype=float)
+	if fit_view:
+		pos = fit(pos, output_size, vertex_size + vertex_pen_width)
+	points, segments, visible = cull(pos, np.asarray(edges, dtype=np.int64), output_size, vertex_extent=vertex_size / 2.0 + vertex_pen_width, edge_extent=edge_pen_width / 2.0)
+
+	surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, int(w), int(h))
+	context = cairo.Context(surface)
+	context.set_line_cap(cairo.LINE_CAP_ROUND)
+
+	context.set_source_rgba(*edge_color)
+	context.set_line_width(edge_pen_width)
+	for a, b in zip(points[segments[:, 0]].tolist(), points[segments[:, 1]].tolist()):
+		context.move_to(*a)
+		context.line_to(*b)
+	context.stroke()
+
+	radius = vertex_size / 2.0
+	for x, y in points[visible].tolist():
+		context.new_sub_path()
+		context.arc(x, y, radius, 0, 2 * np.pi)
+	context.set_source_rgba(*vertex_fill_color)
+	context.fill_preserve()
+	context.set_source_rgba(*vertex_color)
+	context.set_line_width(vertex_pen_width)
+	context.stroke()
+
+	surface.write_to_png(output)
+	return output
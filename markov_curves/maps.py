@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Vertex maps between graphs and array views of graph-tool graphs"""
+
+from graph_tool.all import Graph
+import numpy as np
+
+def middle(a,b):
+	return [(a[0] + b[0])/2.0, (a[1] + b[1])/2.0]
+
+class Map(object):
+	"""Vertex map between two graphs, backed by NumPy index arrays.
+
+	Image of a source vertex is either a vertex of the target graph or a pair [A, B] of target
+	vertices (midpoint of an edge). The first target vertex is kept in column 0 of self.f, the second
+	one in column 1 and self.mid flags the midpoint images. Inverse images are answered from a CSR
+	index that is built lazily and dropped whenever the map changes."""
+
+	def __init__(self, source = None, target = None):
+		if source is None:
+			self.source = Graph()
+		else:
+			self.source = source
+
+		if target is None:
+			self.target = Graph()
+		else:
+			self.target = target
+
+		self.n = 0
+		self.f = np.full((max(self.source.num_vertices(), 1), 2), -1, dtype=np.int64)
+		self.mid = np.zeros(len(self.f), dtype=bool)
+
+		self.inverse_index = None
+
+	@classmethod
+	def from_arrays(cls, source, target, f, mid = None):
+		"""Create map from (n, 2) array of target indices (or from (n,) array if there are no midpoints)"""
+		m = cls(source, target)
+		f = np.asarray(f, dtype=np.int64)
+		if f.ndim == 1:
+			f = np.column_stack((f, f))
+		m.f = np.ascontiguousarray(f)
+		m.n = len(f)
+		if mid is None:
+			m.mid = np.zeros(m.n, dtype=bool)
+		else:
+			m.mid = np.asarray(mid, dtype=bool)
+		return m
+
+	def get_target(self):
+		return self.target
+
+	def get_source(self):
+		return self.source
+
+	def get_arrays(self):
+		"""Return (n, 2) array of target indices and midpoint flags; vertices without image map to -1"""
+		return self.f[:self.n], self.mid[:self.n]
+
+	def reserve(self, n):
+		if n <= len(self.f):
+			return
+		size = max(n, 2 * len(self.f))
+		f = np.full((size, 2), -1, dtype=np.int64)
+		f[:self.n] = self.f[:self.n]
+		mid = np.zeros(size, dtype=bool)
+		mid[:self.n] = self.mid[:self.n]
+		self.f, self.mid = f, mid
+
+	def build_inverse_index(self):
+		"""CSR index of fibres: preimage of target vertex b is order[ptr[b]:ptr[b+1]], midpoints excluded"""
+		f, mid = self.get_arrays()
+		a = np.flatnonzero((f[:, 0] >= 0) & ~mid)
+		b = f[a, 0]
+		order = a[np.argsort(b, kind="stable")]
+		counts = np.bincount(b, minlength=self.target.num_vertices())
+		ptr = np.zeros(len(counts) + 1, dtype=np.int64)
+		np.cumsum(counts, out=ptr[1:])
+
+		# midpoint images are looked up by the (unordered) pair of endpoints
+		m = np.flatnonzero(mid)
+		pairs = np.sort(f[m], axis=1)
+		pair_order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+		self.inverse_index = (ptr, order, pairs[pair_order], m[pair_order])
+		return self.inverse_index
+
+	def inverse(self, b):
+		"""List of source vertices mapped to vertex b, or to the midpoint of the edge b = [A, B]"""
+		if self.inverse_index is None:
+			self.build_inverse_index()
+		ptr, order, pairs, pair_sources = self.inverse_index
+
+		if type(b) is list or type(b) is tuple:
+			key = sorted([int(b[0]), int(b[1])])
+			lo = np.searchsorted(pairs[:, 0], key[0], side="left")
+			hi = np.searchsorted(pairs[:, 0], key[0], side="right")
+			second = pairs[lo:hi, 1]
+			idx = pair_sources[lo + np.searchsorted(second, key[1], side="left"):lo + np.searchsorted(second, key[1], side="right")]
+		else:
+			b = int(b)
+			if b + 1 >= len(ptr):
+				return []
+			idx = order[ptr[b]:ptr[b + 1]]
+		return [self.source.vertex(a) for a in idx]
+
+	def __setitem__(self, a, b):
+		a = int(a)
+		if a >= self.n:
+			self.reserve(a + 1)
+			self.n = a + 1
+		if type(b) is list or type(b) is tuple:
+			self.f[a] = (int(b[0]), int(b[1]))
+			self.mid[a] = True
+		else:
+			self.f[a] = int(b)
+			self.mid[a] = False
+		self.inverse_index = None
+
+	def __getitem__(self, a):
+		a = int(a)
+		if a >= self.n or self.f[a, 0] < 0:
+			raise KeyError(a)
+		if self.mid[a]:
+			return [self.target.vertex(self.f[a, 0]), self.target.vertex(self.f[a, 1])]
+		return self.target.vertex(self.f[a, 0])
+
+	def __contains__(self, a):
+		a = int(a)
+		return a < self.n and self.f[a, 0] >= 0
+
+	def __len__(self):
+		return int(np.count_nonzero(self.f[:self.n, 0] >= 0))
+
+	def __str__(self):
+		s = ""
+		for v in np.flatnonzero(self.f[:self.n, 0] >= 0):
+			if not s == "":
+				s += ", "
+			s += str(v) + " -> "
+			if self.mid[v]:
+				s += str(self.f[v, 0]) + ":" + str(self.f[v, 1])
+			else:
+				s += str(self.f[v, 0])
+		return s
+
+def edge_array(g):
+	"""Edges of g as (m, 2) array, in the order of g.edges()"""
+	a = np.array([(int(e.source()), int(e.target())) for e in g.edges()], dtype=np.int64)
+	return a.reshape(-1, 2)
+
+def position_array(g, name = "pos"):
+	"""Vertex positions of g as (n, 2) array"""
+	return g.vp[name].get_2d_array([0, 1]).T.copy()
+
+def anchor_array(f, mid, bottom_pos):
+	"""Positions of bonding images f, mid (midpoints for edge images) given (nb, 2) bottom positions"""
+	anchors = bottom_pos[f[:, 0]]
+	anchors[mid] = (anchors[mid] + bottom_pos[f[mid, 1]]) / 2.0
+	return anchors
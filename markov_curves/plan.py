@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Closed-form size planning of elementary Markov sequences, without building any graph"""
+
+import itertools
+
+import numpy as np
+
+from .maps import edge_array
+
+# Rough per-item costs of an assembled level (graph-tool adjacency, "pos" and "relpos" vector properties,
+# bonding map arrays, assembler temporaries); calibrate against the benchmark suite
+BYTES_PER_VERTEX = 56 + 2 * 40 + 17 + 40
+BYTES_PER_EDGE = 32 + 8 + 48
+MS_PER_VERTEX = 0.0004
+MS_PER_EDGE = 0.0006
+
+class Transfer(object):
+	"""Growth of an elementary diagram from one level to the next, derived from the compiled assembler.
+
+	Vertex and edge counts follow (V', E') = T (V, E). For degrees, every vertex is described by its
+	numbers of outgoing and incoming edges (orientation of edges as inserted): copy of "V" vertex k over a
+	bottom vertex with (o, i) gets (out_v[k] + o out_l[k] + i out_r[k], in_v[k] + o in_l[k] + i in_r[k]) and
+	new vertex r of a copy of "E" gets (out_n[r], in_n[r])."""
+
+	def __init__(self, cls):
+		a = cls.get_assembler()
+		nv = a.v_size
+
+		kept_v = a.v_stamped.tolist()
+		self.out_v = np.bincount([s for s, _ in kept_v], minlength=nv)
+		self.in_v = np.bincount([t for _, t in kept_v], minlength=nv)
+		self.out_l, self.in_l = np.zeros(nv, dtype=np.int64), np.zeros(nv, dtype=np.int64)
+		self.out_r, self.in_r = np.zeros(nv, dtype=np.int64), np.zeros(nv, dtype=np.int64)
+
+		# Exact counts need every stamped edge of a copy of "E" to be new; shared edges (see
+		# ElementaryAssembler.classify_edges) are counted once per copy of "E", an upper bound
+		self.exact = True
+		e_edges = 0
+		n_new = 0
+		if a.e_edges is not None:
+			n_new = len(a.e_new)
+			rank = dict((int(k), r) for r, k in enumerate(a.e_new))
+			self.out_n, self.in_n = np.zeros(n_new, dtype=np.int64), np.zeros(n_new, dtype=np.int64)
+			self.exact = not len(a.e_shared)
+			for s, t in a.e_stamped.tolist():
+				e_edges += 1
+				for x, out in [(s, True), (t, False)]:
+					side = a.e_side[x]
+					if side < 0:
+						(self.out_n if out else self.in_n)[rank[x]] += 1
+					elif side == 0:
+						(self.out_l if out else self.in_l)[a.e_source[x]] += 1
+					else:
+						(self.out_r if out else self.in_r)[a.e_source[x]] += 1
+		else:
+			self.out_n, self.in_n = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+		self.matrix = np.array([[nv, n_new], [len(kept_v), e_edges]], dtype=np.int64)
+
+	def step(self, histogram):
+		"""Histogram {(out, in): count} of the next level"""
+		result = dict()
+		edges = 0
+		for (o, i), c in histogram.items():
+			edges += o * c
+			for k in range(len(self.out_v)):
+				key = (int(self.out_v[k] + o * self.out_l[k] + i * self.out_r[k]), int(self.in_v[k] + o * self.in_l[k] + i * self.in_r[k]))
+				result[key] = result.get(key, 0) + c
+		for r in range(len(self.out_n)):
+			key = (int(self.out_n[r]), int(self.in_n[r]))
+			result[key] = result.get(key, 0) + edges
+		return result
+
+def orientation_histogram(g):
+	"""Histogram {(out, in): count} of vertices of g"""
+	n = g.num_vertices()
+	edges = edge_array(g)
+	out = np.bincount(edges[:, 0], minlength=n)
+	inc = np.bincount(edges[:, 1], minlength=n)
+	result = dict()
+	for key in zip(out.tolist(), inc.tolist()):
+		result[key] = result.get(key, 0) + 1
+	return result
+
+def predict(cls, starting_graph = None):
+	"""Predicted sizes of levels 0, 1, ... of the sequence of an elementary diagram, without end (see plan).
+	The histogram can have a key per vertex (e.g. for complete graphs), so stop at the first level too large."""
+	if starting_graph is None:
+		starting_graph = cls.get_starting_graph()
+	t = Transfer(cls)
+
+	histogram = orientation_histogram(starting_graph)
+	level = 0
+	while True:
+		vertices = sum(histogram.values())
+		edges = sum(o * c for (o, i), c in histogram.items())
+		degrees = dict()
+		for (o, i), c in histogram.items():
+			degrees[o + i] = degrees.get(o + i, 0) + c
+		yield {
+			"level": level,
+			"vertices": vertices,
+			"edges": edges,
+			"degrees": degrees,
+			"memory_bytes": vertices * BYTES_PER_VERTEX + edges * BYTES_PER_EDGE,
+			"time_ms": 0.0 if level == 0 else vertices * MS_PER_VERTEX + edges * MS_PER_EDGE,
+			"exact": t.exact
+		}
+		histogram = t.step(histogram)
+		level += 1
+
+def plan(cls, levels, starting_graph = None):
+	"""Predicted size of levels 0, ..., levels of the sequence of an elementary diagram.
+
+	Returns list of dicts with keys: level, vertices, edges, degrees ({degree: count}), memory_bytes,
+	time_ms (estimated assembly time of the level) and exact (False if counts are upper bounds)."""
+	return list(itertools.islice(predict(cls, starting_graph), levels + 1))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Rendering of diagram levels in a process pool, or in threads while the next levels are assembled"""
+
+from graph_tool.all import Graph, graph_draw, sfdp_layout
+import numpy as np
+import multiprocessing
+import threading
+
+try:
+	import queue
+except ImportError:
+	import Queue as queue
+
+from .instrument import span
+
+def draw_job(g, pos, output, layout = None, **options):
+	"""Compact, picklable description of a graph_draw call: vertex count, edge array and (n, 2) positions.
+	With layout="sfdp" positions are computed by the worker"""
+	return array_job(g.num_vertices(), g.get_edges()[:, :2], pos, output, layout, g.is_directed(), **options)
+
+def array_job(n, edges, pos, output, layout = None, directed = False, **options):
+	"""Draw job of a graph given by its vertex count and (m, 2) edges (see draw_job)"""
+	return {
+		"n": n,
+		"directed": directed,
+		"edges": np.asarray(edges).astype(np.int32),
+		"pos": pos,
+		"layout": layout,
+		"output": output,
+		"options": options
+	}
+
+def render_job(job):
+	"""Render a draw job, timed as a "render" span"""
+	with span("render", output=job["output"], vertices=job["n"], renderer=job.get("renderer")):
+		return draw(job)
+
+def draw(job):
+	"""Render a draw job: with draw_lod straight from its arrays, otherwise rebuild its graph for graph_draw"""
+	if job.get("renderer") == "lod" and job["layout"] != "sfdp":
+		from .lod import draw_lod
+		return draw_lod(job["edges"], np.asarray(job["pos"]), job["output"], **job["options"])
+
+	g = Graph(directed=job["directed"])
+	if job["n"]:
+		g.add_vertex(job["n"])
+	g.add_edge_list(job["edges"])
+
+	if job["layout"] == "sfdp":
+		pos = sfdp_layout(g)
+	else:
+		pos = g.new_vertex_property("vector<double>")
+		pos.set_2d_array(np.asarray(job["pos"]).T)
+
+	if job.get("renderer") == "lod":
+		from .lod import draw_lod
+		return draw_lod(job["edges"], pos.get_2d_array([0, 1]).T, job["output"], **job["options"])
+
+	graph_draw(g, pos=pos, output=job["output"], **job["options"])
+	return job["output"]
+
+def render(jobs, processes = None, renderer = "graph_draw"):
+	"""Render draw jobs in a process pool, largest graphs first; processes=1 renders in this process.
+	With renderer="lod" levels are drawn by draw_lod, culled to the image resolution"""
+	jobs = sorted(jobs, key=lambda job: job["n"] + len(job["edges"]), reverse=True)
+	for job in jobs:
+		job["renderer"] = renderer
+	if processes == 1:
+		return [render_job(job) for job in jobs]
+
+	pool = multiprocessing.Pool(processes)
+	try:
+		return list(pool.imap_unordered(render_job, jobs))
+	finally:
+		pool.close()
+		pool.join()
+
+def pipeline(jobs, threads = 1, depth = 2, renderer = "graph_draw"):
+	"""Render draw jobs taken from an iterable (e.g. the generators of figures) in threads while the iterable
+	assembles and lays out the next levels; graph_draw and cairo release the GIL while drawing.
+
+	At most depth jobs wait in a queue: the producer blocks when it is full, so at most depth + threads levels
+	are held besides the one being assembled. Returns outputs in order of completion. An exception of a
+	job stops the producer and is raised once the threads are done."""
+	tasks = queue.Queue(maxsize=depth)
+	outputs, errors = [], []
+
+	def consume():
+		while True:
+			job = tasks.get()
+			if job is None:
+				return
+			# After an error jobs are only drained, so that the producer is never blocked
+			if errors:
+				continue
+			try:
+				outputs.append(render_job(job))
+			except Exception as e:
+				errors.append(e)
+
+	workers = [threading.Thread(target=consume) for _ in range(threads)]
+	for worker in workers:
+		worker.daemon = True
+		worker.start()
+	try:
+		for job in jobs:
+			if errors:
+				break
+			job["renderer"] = renderer
+			with span("backpressure", queued=tasks.qsize()):
+				tasks.put(job)
+	finally:
+		for worker in workers:
+			tasks.put(None)
+		for worker in workers:
+			worker.join()
+	if errors:
+		raise errors[0]
+	return outputs
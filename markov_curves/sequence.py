@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Inverse sequences of graphs generated by Markov diagrams"""
+
+import numpy as np
+
+from .cache import level_key
+from .checkpoint import positions_key, starting_key
+from .connectivity import components, track
+from .decomposition import Decomposition
+from .diagram import ElementaryMarkovDiagram
+from .instrument import span
+
+class MarkovSequence(object):
+	"""Holds a (finite) inverse sequence with corresponding decompositions.
+
+	Levels are produced lazily by iterating over the sequence. Only the current level is kept, together with
+	the bonding map to its predecessor as compact index arrays; decompositions and their charts are dropped
+	as soon as the next level is assembled. With a LevelCache, levels are loaded from the cache instead of
+	being assembled whenever possible; processes > 1 assembles each level in a process pool.
+
+	With projections=True the sequence also keeps composed projections p_{n,k} from the current level n to
+	every level k < n, updated by one gather per stored level when a level is added. Midpoint images are
+	followed along both ends: p_{n,k} is a pair (lo, hi) of index arrays, lo following the first and hi the
+	second end of every midpoint image. A vertex projects to a vertex of level k iff lo == hi; otherwise
+	its image lies between lo and hi.
+
+	With connectivity=True connectivity of every level is counted by union-find: components[i] is the number
+	of components of level i and fibre_components the number of components of each fibre of the current
+	bonding map.
+
+	With a Checkpoint every level is stored as soon as it is complete, and stored levels are loaded instead
+	of assembled: an interrupted run resumes after its last stored level. Stored positions are used when they
+	were laid out with the same layouts from the same positions (tracked by a chain of keys), otherwise the
+	stored level is only laid out again. With from_level=k levels below k are not yielded and levels up to k
+	keep their stored positions whatever the layouts, so a run restarts from stored level k with different
+	layouts of deeper levels."""
+
+	def __init__(self, cls, n, layouts = None, starting_graph = None, cache = None, processes = None, projections = False, connectivity = False,
+			checkpoint = None, from_level = None):
+		self.cls = cls
+		self.n = n
+		self.layouts = layouts
+		self.cache = cache
+		self.processes = processes
+		self.track_projections = projections
+		self.projections = None
+		self.track_connectivity = connectivity
+		self.components = None
+		self.fibre_components = None
+		self.checkpoint = checkpoint
+		self.from_level = from_level
+		if starting_graph is None:
+			self.starting_graph = cls.get_starting_graph()
+		else:
+			self.starting_graph = starting_graph
+
+		self.level = None
+		self.graph = None
+		self.bonding_map = None
+
+	def __iter__(self):
+		return self.levels()
+
+	def levels(self):
+		"""Yield (i, graph of level i) for i = 0, ..., n; layouts[i] = (d1, d2) positions level i + 1"""
+		self.level, self.graph, self.bonding_map = 0, self.starting_graph, None
+		self.projections = []
+		if self.track_connectivity:
+			self.components = [components(self.graph.num_vertices(), self.graph.get_edges()[:, :2])]
+		key = None
+		if self.checkpoint is not None:
+			self.checkpoint.open(self.cls, self.starting_graph)
+			key = starting_key(self.starting_graph)
+		if not self.from_level:
+			yield self.level, self.graph
+		elif self.checkpoint is None or self.from_level > self.n:
+			raise ValueError("Cannot start from level %d without a checkpoint of it" % self.from_level)
+
+		try:
+			while self.level < self.n:
+				with span("level", diagram=self.cls.__name__, level=self.level + 1):
+					layout = self.layouts[self.level] if self.layouts is not None else None
+					key = positions_key(key, layout)
+					d, key = self.restore(self.level + 1, key)
+					if d is None:
+						if self.from_level and self.level < self.from_level:
+							raise ValueError("Level %d is not checkpointed" % (self.level + 1))
+						d = self.assemble()
+						if layout is not None:
+							d.layout(*layout)
+						if self.checkpoint is not None:
+							self.checkpoint.save(self.level + 1, d, layout, key)
+					if self.track_connectivity:
+						self.components.append(d.components)
+						self.fibre_components = d.fibre_components
+
+				f, mid = d.bonding_map.get_arrays()
+				if self.graph.num_vertices() < 2**31:
+					f = f.astype(np.int32)
+				if self.track_projections:
+					self.projections = [(lo[f[:, 0]], hi[f[:, 1]]) for lo, hi in self.projections] + [(f[:, 0], f[:, 1])]
+				self.level, self.graph, self.bonding_map = self.level + 1, d.upper_graph, (f, mid)
+				del d
+
+				if not self.from_level or self.level >= self.from_level:
+					yield self.level, self.graph
+		finally:
+			# The process pool of an elementary assembler is kept between levels, not between runs
+			if self.processes is not None and self.processes > 1 and issubclass(self.cls, ElementaryMarkovDiagram):
+				self.cls.get_assembler().close()
+
+	def assemble(self):
+		if self.cache is None:
+			return self.cls.assemble(self.graph, self.processes, self.track_connectivity)
+		return self.cache.assemble(self.cls, self.graph, level_key(self.cls, self.starting_graph, self.level + 1), self.processes, self.track_connectivity)
+
+	def restore(self, level, key):
+		"""Decomposition of the current graph loaded from the checkpoint and the key of its positions, or
+		(None, key). Stored positions are used if their key is key or level is at most from_level; otherwise
+		the level is laid out again and stored."""
+		if self.checkpoint is None:
+			return None, key
+		record = self.checkpoint.load(level, self.graph.num_vertices())
+		if record is None:
+			return None, key
+		d = Decomposition.from_arrays(self.cls, self.graph, record["edges"], record["relpos"], record["bonding"], record["mid"])
+		if self.track_connectivity:
+			track(d, self.graph.num_vertices())
+
+		stored = record["entry"]["positions"]
+		if "pos" in record and (stored == key or (self.from_level and level <= self.from_level)):
+			d.upper_graph.vp["pos"] = d.upper_graph.new_vertex_property("vector<double>")
+			d.upper_graph.vp.pos.set_2d_array(record["pos"].T)
+			return d, stored
+		if key is not None:
+			d.layout(*self.layouts[level - 1])
+			self.checkpoint.save(level, d, self.layouts[level - 1], key)
+		return d, key
+
+	def projection(self, k):
+		"""Composed projection (lo, hi) from the current level to level k"""
+		if k == self.level:
+			identity = np.arange(self.graph.num_vertices())
+			return identity, identity
+		if not self.track_projections:
+			raise ValueError("Sequence does not track projections")
+		return self.projections[k]
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Versioned single-file storage of Markov sequences with memory-mapped random access.
+
+File layout: 16-byte preamble (magic, format version), array data aligned to 64 bytes, JSON index of
+arrays (offset, dtype, shape) per level, and 24-byte trailer (index offset, index length, magic). Levels
+are appended one at a time, so a sequence can be written while it is being generated.
+
+Also atomic writes of the files and directories of caches, checkpoints, tile pyramids and baselines."""
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+from graph_tool.all import Graph
+import numpy as np
+
+MAGIC = b"MRKVSEQ\0"
+VERSION = 1
+ALIGN = 64
+
+def write_json(path, data, **options):
+	"""Write data as JSON to path atomically: to a temporary file in the same directory, renamed to path"""
+	fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+	try:
+		with os.fdopen(fd, "w") as f:
+			json.dump(data, f, **options)
+		os.rename(tmp, path)
+	finally:
+		if os.path.exists(tmp):
+			os.remove(tmp)
+
+def write_directory(path, write, replace = False):
+	"""Create directory path atomically: write(tmp) fills a temporary directory next to it, which is then
+	renamed to path. An existing directory is replaced if replace, and kept otherwise (as written by another
+	process at the same time). The temporary directory is removed if anything fails."""
+	tmp = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+	try:
+		write(tmp)
+		if replace and os.path.isdir(path):
+			shutil.rmtree(path)
+		try:
+			os.rename(tmp, path)
+		except OSError:
+			if replace or not os.path.isdir(path):
+				raise
+	finally:
+		shutil.rmtree(tmp, ignore_errors=True)
+
+def csr_adjacency(n, edges):
+	"""Symmetric CSR adjacency (indptr, indices) of an undirected graph with (m, 2) edge array"""
+	edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+	s = np.concatenate((edges[:, 0], edges[:, 1]))
+	t = np.concatenate((edges[:, 1], edges[:, 0]))
+	order = np.argsort(s, kind="stable")
+	indptr = np.zeros(n + 1, dtype=np.int64)
+	np.cumsum(np.bincount(s, minlength=n), out=indptr[1:])
+	indices = t[order]
+	if n < 2**31:
+		indices = indices.astype(np.int32)
+	return indptr, indices
+
+class SequenceWriter(object):
+	"""Appends levels (graph, positions, bonding map to the previous level) to a sequence file"""
+
+	def __init__(self, path, metadata = None):
+		self.file = open(path, "wb")
+		self.file.write(MAGIC + struct.pack("<II", VERSION, 0))
+		self.index = {"version": VERSION, "metadata": metadata or {}, "levels": []}
+
+	def write_array(self, a):
+		a = np.ascontiguousarray(a)
+		a = a.astype(a.dtype.newbyteorder("<"), copy=False)
+		pad = -self.file.tell() % ALIGN
+		self.file.write(b"\0" * pad)
+		offset = self.file.tell()
+		self.file.write(a.tobytes())
+		return {"offset": offset, "dtype": a.dtype.str, "shape": list(a.shape)}
+
+	def add_level(self, g, bonding_map = None):
+		"""Append graph g; bonding_map is (f, mid) of the map from g to the previous level"""
+		n = g.num_vertices()
+		indptr, indices = csr_adjacency(n, g.get_edges()[:, :2])
+		arrays = {"indptr": self.write_array(indptr), "indices": self.write_array(indices)}
+		if "pos" in g.vp:
+			arrays["pos"] = self.write_array(g.vp.pos.get_2d_array([0, 1]).T)
+		if bonding_map is not None:
+			f, mid = bonding_map
+			arrays["bonding"] = self.write_array(f)
+			arrays["mid"] = self.write_array(np.asarray(mid, dtype=np.uint8))
+		self.index["levels"].append({"vertices": n, "edges": int(len(indices) // 2), "arrays": arrays})
+
+	def close(self):
+		pad = -self.file.tell() % ALIGN
+		self.file.write(b"\0" * pad)
+		offset = self.file.tell()
+		data = json.dumps(self.index).encode("utf-8")
+		self.file.write(data)
+		self.file.write(struct.pack("<QQ", offset, len(data)) + MAGIC)
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+def write_sequence(path, sequence, metadata = None):
+	"""Generate all levels of a MarkovSequence into a sequence file"""
+	with SequenceWriter(path, metadata) as writer:
+		for i, g in sequence:
+			writer.add_level(g, sequence.bonding_map)
+
+class SequenceFile(object):
+	"""Read-only view of a sequence file; arrays of a level are memory-mapped when requested"""
+
+	def __init__(self, path):
+		self.path = path
+		with open(path, "rb") as f:
+			preamble = f.read(16)
+			if preamble[:8] != MAGIC:
+				raise ValueError(path + " is not a Markov sequence file")
+			version = struct.unpack("<I", preamble[8:12])[0]
+			if version > VERSION:
+				raise ValueError("Unsupported sequence file version %d" % version)
+			f.seek(-24, 2)
+			trailer = f.read(24)
+			if trailer[16:] != MAGIC:
+				raise ValueError(path + " is truncated")
+			offset, length = struct.unpack("<QQ", trailer[:16])
+			f.seek(offset)
+			self.index = json.loads(f.read(length).decode("utf-8"))
+		self.metadata = self.index["metadata"]
+
+	def __len__(self):
+		return len(self.index["levels"])
+
+	def array(self, k, name):
+		entry = self.index["levels"][k]["arrays"].get(name)
+		if entry is None:
+			return None
+		shape = tuple(entry["shape"])
+		if 0 in shape:
+			return np.zeros(shape, dtype=entry["dtype"])
+		return np.memmap(self.path, dtype=entry["dtype"], mode="r", offset=entry["offset"], shape=shape)
+
+	def adjacency(self, k):
+		"""CSR adjacency (indptr, indices) of level k"""
+		return self.array(k, "indptr"), self.array(k, "indices")
+
+	def positions(self, k):
+		"""(n, 2) vertex positions of level k, or None"""
+		return self.array(k, "pos")
+
+	def bonding_map(self, k):
+		"""Bonding map from level k to level k - 1 as (n, 2) target indices and midpoint flags"""
+		if k == 0:
+			raise ValueError("Level 0 has no bonding map")
+		return self.array(k, "bonding"), self.array(k, "mid").view(bool)
+
+	def edges(self, k):
+		"""(m, 2) edge array of level k, each edge listed once"""
+		indptr, indices = self.adjacency(k)
+		s = np.repeat(np.arange(len(indptr) - 1, dtype=np.int64), np.diff(indptr))
+		keep = s <= indices
+		return np.column_stack((s[keep], indices[keep]))
+
+	def graph(self, k):
+		"""Level k as graph-tool graph (with "pos" vertex property if positions were stored)"""
+		g = Graph(directed=False)
+		n = self.index["levels"][k]["vertices"]
+		if n:
+			g.add_vertex(n)
+		g.add_edge_list(self.edges(k))
+		pos = self.positions(k)
+		if pos is not None:
+			g.vp["pos"] = g.new_vertex_property("vector<double>")
+			g.vp.pos.set_2d_array(np.asarray(pos).T)
+		return g
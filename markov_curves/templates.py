@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Productions and gluings compiled into frozen NumPy arrays"""
+
+import numpy as np
+
+from .maps import edge_array, position_array
+
+def frozen(a, dtype = None):
+	"""Read-only copy of an array"""
+	a = np.array(a, dtype=dtype)
+	a.flags.writeable = False
+	return a
+
+def padded(f, n):
+	"""First column of (k, 2) map array f, extended with -1 to n entries (vertices without image)"""
+	column = np.full(n, -1, dtype=np.int64)
+	column[:len(f)] = f[:n, 0]
+	return column
+
+class ProductionTemplate(object):
+	"""Production as arrays: top_size and bottom_size, (m, 2) top edges in order of top.edges(), (n, 2)
+	relative positions of top vertices, and bonding map as (n, 2) bottom indices with (n,) midpoint flags"""
+
+	def __init__(self, production):
+		top, bottom = production.get_top(), production.get_bottom()
+		self.top_size = top.num_vertices()
+		self.bottom_size = bottom.num_vertices()
+		self.edges = frozen(edge_array(top), np.int64)
+		self.relpos = frozen(position_array(top) if "pos" in top.vp else np.zeros((self.top_size, 2)), float)
+
+		f, mid = production.get_bonding_map().get_arrays()
+		bonding = np.full((self.top_size, 2), -1, dtype=np.int64)
+		bonding[:len(f)] = f[:self.top_size]
+		self.bonding = frozen(bonding)
+		self.mid = frozen(np.concatenate((mid[:self.top_size], np.zeros(max(self.top_size - len(mid), 0), dtype=bool))))
+
+class GluingTemplate(object):
+	"""Gluing as arrays: top[u] is the vertex of the target top graph glued to vertex u of the source top
+	graph, bottom[b] likewise for bottom graphs (-1 for vertices that are not glued)"""
+
+	def __init__(self, gluing):
+		top, bottom = gluing.get_top_glue(), gluing.get_bottom_glue()
+		self.top = frozen(padded(top.get_arrays()[0], top.get_source().num_vertices()))
+		self.bottom = frozen(padded(bottom.get_arrays()[0], bottom.get_source().num_vertices()))
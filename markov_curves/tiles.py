@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Deep-zoom tile pyramids: coarse tiles drawn from lower levels, fine tiles from deeper ones"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+
+import numpy as np
+
+from .cache import diagram_fingerprint, graph_fingerprint, hash_arrays
+from .maps import edge_array, position_array
+from .plan import plan
+from .render import array_job, render_job
+from .sequence import MarkovSequence
+from .storage import write_json
+from .zoom import Neighbourhoods, zoom
+
+FORMAT = 1
+
+def descendant_radii(cls, layouts, base, length, levels):
+	"""Bounds derived from the affine maps of the layouts, for j = 0, ..., levels: R[j] is the radius around
+	a vertex of level base containing every vertex of level base + j above it, l[j] bounds edge lengths of
+	level base + j; length is the longest edge of level base.
+
+	A vertex of a copy of "E" is placed at s + c (t - s) + relpos (d1, d2) for its anchor c in {0, 1/2, 1}
+	on the bottom edge (s, t), so an upper edge is at most |c1 - c2| l + |(relpos1 - relpos2) (d1, d2)| long."""
+	a = cls.get_assembler()
+	edges = a.v_edges
+	bounds = [(np.zeros(len(edges)), a.v_relpos[edges[:, 0]] - a.v_relpos[edges[:, 1]])]
+	if a.e_edges is not None:
+		relpos = np.empty((len(a.e_side), 2))
+		anchor = np.empty(len(a.e_side))
+		glued = a.e_side >= 0
+		relpos[glued], anchor[glued] = a.v_relpos[a.e_source[glued]], a.e_side[glued]
+		relpos[a.e_new], anchor[a.e_new] = a.e_relpos, a.e_bonding.mean(axis=1)
+		edges = a.e_edges
+		bounds.append((np.abs(anchor[edges[:, 0]] - anchor[edges[:, 1]]), relpos[edges[:, 0]] - relpos[edges[:, 1]]))
+	shift = 0.5 if a.e_edges is not None and np.any(a.e_mid) else 0.0
+	offsets = np.concatenate((a.v_relpos, a.e_relpos)) if a.e_edges is not None else a.v_relpos
+
+	R, l = [0.0], [float(length)]
+	for k in range(base, base + levels):
+		d = np.array(layouts[k], dtype=float)
+		rho = np.linalg.norm(offsets.dot(d), axis=1).max() if len(offsets) else 0.0
+		R.append(R[-1] + rho + shift * l[-1])
+		l.append(max([0.0] + [(t * l[-1] + np.linalg.norm(r.dot(d), axis=1)).max() for t, r in bounds if len(t)]))
+	return np.array(R), np.array(l)
+
+def edge_length(g):
+	"""Length of the longest edge of g (0 without edges)"""
+	pos, edges = position_array(g), edge_array(g)
+	return float(np.linalg.norm(pos[edges[:, 0]] - pos[edges[:, 1]], axis=1).max()) if len(edges) else 0.0
+
+def box_distance(pos, box):
+	"""Distances of (n, 2) points to the rectangle box = (x0, y0, x1, y1)"""
+	d = np.maximum(np.maximum(box[:2] - pos, pos - box[2:]), 0)
+	return np.hypot(d[:, 0], d[:, 1])
+
+class TileGrid(object):
+	"""Points binned into the n x n tiles of given width from origin (points outside into the border tiles),
+	so that the points near a tile are found without measuring the distance of all of them"""
+
+	def __init__(self, pos, origin, width, n):
+		self.pos, self.width, self.n = pos, width, n
+		cell = np.clip(np.floor((pos - origin) / width).astype(np.int64), 0, n - 1)
+		ids = cell[:, 0] * n + cell[:, 1]
+		self.order = np.argsort(ids, kind="stable")
+		self.ids = ids[self.order]
+
+	def near(self, x, y, box, radius):
+		"""Sorted indices of the points within radius of box, the rectangle of tile (x, y)"""
+		k = int(np.ceil(radius / self.width))
+		lo, hi = max(y - k, 0), min(y + k, self.n - 1)
+		columns = np.arange(max(x - k, 0), min(x + k, self.n - 1) + 1, dtype=np.int64)
+		first = np.searchsorted(self.ids, columns * self.n + lo)
+		last = np.searchsorted(self.ids, columns * self.n + hi + 1)
+		candidates = np.sort(np.concatenate([self.order[a:b] for a, b in zip(first, last)]))
+		return candidates[box_distance(self.pos[candidates], box) <= radius]
+
+def tile_path(directory, z, x, y):
+	return os.path.join(directory, str(z), str(x), str(y) + ".png")
+
+# State of the tile workers of export_pyramid, set by start_tiles
+TILES = None
+
+def start_tiles(state):
+	global TILES
+	TILES = state
+
+def render_tile(coordinates):
+	"""Render tile (z, x, y) of the pyramid described by the worker state; returns its path, or None if the
+	tile has nothing in it"""
+	z, x, y = coordinates
+	s = TILES
+	level, base, tile = s["levels"][z], s["base"], s["tile"]
+	grid, radius = s["grids"][z]
+	width = s["size"] / 2**z
+	corner = s["origin"] + (x * width, y * width)
+	box = np.concatenate((corner, corner + width))
+
+	# Every vertex of a visible edge is within one edge length of the tile
+	candidates = grid.near(x, y, box, radius)
+	if not len(candidates):
+		return None
+	if level in s["graphs"]:
+		local = s["graphs"][level]
+		edges, pos = local.induced_edges(candidates), local.pos[candidates]
+	else:
+		h = zoom(s["cls"], s["base_graph"], candidates, level - base, s["layouts"][base:])[-1][0]
+		edges, pos = h.get_edges()[:, :2], position_array(h)
+
+	path = tile_path(s["directory"], z, x, y)
+	try:
+		os.makedirs(os.path.dirname(path))
+	except OSError:
+		if not os.path.isdir(os.path.dirname(path)):
+			raise
+	job = array_job(len(pos), edges, (pos - corner) * (tile / width), path, output_size=(tile, tile), fit_view=False, **s["style"])
+	job["renderer"] = "lod"
+	return render_job(job)
+
+def pyramid_key(cls, g, layouts, levels, tile, style):
+	h = hashlib.sha1()
+	h.update(("markov_curves tiles %d" % FORMAT).encode())
+	h.update(diagram_fingerprint(cls).encode())
+	graph_fingerprint(h, g)
+	hash_arrays(h, np.array(layouts[:max(levels)], dtype=float), np.array(levels), np.array([tile]))
+	h.update(repr(sorted(style.items())).encode())
+	return h.hexdigest()
+
+def export_pyramid(cls, layouts, directory, levels, base = None, tile = 256, processes = None, starting_graph = None, max_vertices = 2**20, **style):
+	"""Write a tile pyramid of the sequence of an elementary diagram to directory/z/x/y.png, with a manifest.
+
+	Zoom z has 2^z x 2^z tiles of tile x tile pixels showing level levels[z]; layouts[i] = (d1, d2)
+	positions level i + 1. Levels up to base (default: the deepest one of at most max_vertices vertices,
+	by plan) are assembled whole. A tile of a deeper level is drawn from the part of it above the vertices
+	of level base whose descendant radius reaches the tile (see zoom). Tiles are drawn by draw_lod with
+	style as its options; tiles with nothing in them are not written.
+
+	Tiles are rendered in a process pool and kept on disk: a run with the same diagram, layouts, levels
+	and style only renders missing tiles (also after an interrupted run), other runs start from scratch.
+	The manifest has "complete": false until all tiles are written."""
+	if base is None:
+		sizes = plan(cls, max(levels), starting_graph)
+		base = max([min(levels)] + [i for i in levels if sizes[i]["vertices"] <= max_vertices])
+
+	graphs = {}
+	for i, g in MarkovSequence(cls, base, layouts, starting_graph=starting_graph):
+		if i in levels:
+			graphs[i] = g
+	pos = position_array(g)
+	lengths = dict((i, edge_length(h)) for i, h in graphs.items())
+	R, l = descendant_radii(cls, layouts, base, edge_length(g), max(max(levels) - base, 0))
+
+	reach = R[-1] + l[-1]
+	origin = pos.min(axis=0) - reach
+	size = float((pos.max(axis=0) + reach - origin).max()) or 1.0
+
+	# The key is stored before any tile is rendered, so tiles without a manifest or of another key are stale
+	key = pyramid_key(cls, g, layouts, levels, tile, style)
+	manifest_path = os.path.join(directory, "manifest.json")
+	previous = None
+	if os.path.exists(manifest_path):
+		with open(manifest_path) as f:
+			previous = json.load(f).get("key")
+	if previous != key:
+		for z in range(64):
+			shutil.rmtree(os.path.join(directory, str(z)), ignore_errors=True)
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+	write_json(manifest_path, {"format": FORMAT, "key": key, "complete": False})
+
+	# Tile workers get the adjacency and positions of every drawn graph once; per tile only (z, x, y) is sent
+	local = Neighbourhoods(g)
+	state = {"cls": cls, "layouts": layouts, "directory": directory, "levels": levels, "base": base, "tile": tile,
+		"origin": origin, "size": size, "style": style, "base_graph": local, "graphs": {}, "grids": {}}
+	for z, level in enumerate(levels):
+		if level in graphs:
+			state["graphs"][level] = local if level == base else Neighbourhoods(graphs[level])
+			radius = lengths[level]
+		else:
+			radius = R[level - base] + l[level - base]
+		positions = state["graphs"][level].pos if level in graphs else local.pos
+		state["grids"][z] = (TileGrid(positions, origin, size / 2**z, 2**z), radius)
+
+	tiles = ((z, x, y) for z in range(len(levels)) for x in range(2**z) for y in range(2**z)
+		if not os.path.exists(tile_path(directory, z, x, y)))
+	if processes == 1:
+		start_tiles(state)
+		try:
+			for coordinates in tiles:
+				render_tile(coordinates)
+		finally:
+			start_tiles(None)
+	else:
+		pool = multiprocessing.Pool(processes, initializer=start_tiles, initargs=(state,))
+		try:
+			for _ in pool.imap_unordered(render_tile, tiles, chunksize=4):
+				pass
+		finally:
+			pool.close()
+			pool.join()
+
+	manifest = {"format": FORMAT, "key": key, "complete": True, "tile": tile, "levels": list(levels), "base": base, "origin": origin.tolist(), "size": size}
+	write_json(manifest_path, manifest)
+	return manifest
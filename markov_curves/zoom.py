@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Local assembly: the part of deeper levels above a region of a level"""
+
+from graph_tool.all import Graph
+import numpy as np
+
+from .maps import position_array
+from .storage import csr_adjacency
+
+def induced_subgraph(g, vertices):
+	"""Subgraph of g induced on sorted array of vertex indices, with positions if g has them"""
+	index = np.full(g.num_vertices(), -1, dtype=np.int64)
+	index[vertices] = np.arange(len(vertices))
+	edges = index[g.get_edges()[:, :2]]
+
+	h = Graph(directed=False)
+	if len(vertices):
+		h.add_vertex(len(vertices))
+	h.add_edge_list(edges[(edges[:, 0] >= 0) & (edges[:, 1] >= 0)])
+	if "pos" in g.vp:
+		h.vp["pos"] = h.new_vertex_property("vector<double>")
+		h.vp.pos.set_2d_array(position_array(g)[vertices].T)
+	return h
+
+def closed_neighbourhood(g, region):
+	"""Sorted array of vertices of g in region or adjacent to it"""
+	inside = np.zeros(g.num_vertices(), dtype=bool)
+	inside[region] = True
+	edges = g.get_edges()[:, :2]
+	a, b = inside[edges[:, 0]], inside[edges[:, 1]]
+	return np.unique(np.concatenate((region, edges[a, 1], edges[b, 0])))
+
+class Neighbourhoods(object):
+	"""CSR adjacency and positions of a graph, from which neighbourhoods and induced subgraphs of a region
+	are extracted in time proportional to the degrees in the region (functions above scan the whole graph).
+	Built once for a graph queried many times, e.g. once per tile."""
+
+	def __init__(self, g):
+		self.n = g.num_vertices()
+		self.indptr, self.indices = csr_adjacency(self.n, g.get_edges()[:, :2])
+		self.pos = position_array(g) if "pos" in g.vp else None
+
+	def neighbours(self, vertices):
+		"""(sources, targets) of the adjacency entries of vertices, sources as indices into vertices"""
+		first, last = self.indptr[vertices], self.indptr[np.asarray(vertices, dtype=np.int64) + 1]
+		lengths = last - first
+		sources = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+		entries = np.arange(lengths.sum(), dtype=np.int64) + np.repeat(first - np.cumsum(lengths) + lengths, lengths)
+		return sources, self.indices[entries].astype(np.int64)
+
+	def closed_neighbourhood(self, region):
+		"""Sorted array of vertices in region or adjacent to it"""
+		return np.unique(np.concatenate((region, self.neighbours(region)[1])))
+
+	def induced_edges(self, vertices):
+		"""(m, 2) edges of the subgraph induced on sorted array of vertex indices, numbered by their position in it"""
+		sources, targets = self.neighbours(vertices)
+		index = np.minimum(np.searchsorted(vertices, targets), max(len(vertices) - 1, 0))
+		keep = (vertices[index] == targets) if len(vertices) else np.zeros(0, dtype=bool)
+		sources, index = sources[keep], index[keep]
+		# Every edge is listed at both ends, a loop twice at its vertex
+		loops = np.flatnonzero(sources == index)[::2]
+		edges = np.concatenate((np.flatnonzero(sources < index), loops))
+		return np.column_stack((sources[edges], index[edges]))
+
+	def induced_subgraph(self, vertices):
+		"""Subgraph induced on sorted array of vertex indices, with positions if the graph has them"""
+		h = Graph(directed=False)
+		if len(vertices):
+			h.add_vertex(len(vertices))
+		h.add_edge_list(self.induced_edges(vertices))
+		if self.pos is not None:
+			h.vp["pos"] = h.new_vertex_property("vector<double>")
+			h.vp.pos.set_2d_array(self.pos[vertices].T)
+		return h
+
+def zoom(cls, g, vertices, levels, layouts = None):
+	"""Assemble only the part of the next levels of the sequence of an elementary diagram lying above given
+	vertices of g.
+
+	Level j of the result is the subgraph of level j (level 0 being g) induced on the region above the
+	given vertices together with its neighbours, so that boundary gluings are resolved against a truncated
+	neighbourhood. A vertex is above the region if its bonding image is in the region (for midpoint images:
+	both ends are). Edges between two neighbours outside of the region may be missing.
+
+	Returns list of (graph, region, bonding) with region an array of vertex indices of graph and bonding the
+	(f, mid) arrays of the map to the graph of the previous level (None for level 0). layouts[j] = (d1, d2)
+	positions level j + 1. g may be given as Neighbourhoods of the graph, for many zooms into one graph: cost is
+	then proportional to the size of the region, not of g."""
+	local = g if isinstance(g, Neighbourhoods) else Neighbourhoods(g)
+	region = np.unique(np.asarray(vertices, dtype=np.int64))
+	ring = local.closed_neighbourhood(region)
+	h = local.induced_subgraph(ring)
+	region = np.searchsorted(ring, region)
+
+	result = [(h, region, None)]
+	for j in range(levels):
+		d = cls.assemble(h)
+		if layouts is not None:
+			d.layout(*layouts[j])
+
+		f, mid = d.bonding_map.get_arrays()
+		inside = np.zeros(h.num_vertices(), dtype=bool)
+		inside[region] = True
+		region = np.flatnonzero(inside[f[:, 0]] & inside[f[:, 1]])
+
+		ring = closed_neighbourhood(d.upper_graph, region)
+		h = induced_subgraph(d.upper_graph, ring)
+		region = np.searchsorted(ring, region)
+		result.append((h, region, (f[ring], mid[ring])))
+	return result
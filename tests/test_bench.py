@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip("graph_tool")
+
+from markov_curves import MarkovSequence
+from markov_curves.bench import same_assembly
+from markov_curves.diagrams import DiamondDiagram
+from markov_curves.maps import position_array
+
+def level(i):
+	for _, g in MarkovSequence(DiamondDiagram, i):
+		pass
+	return g
+
+def test_same_assembly_compares_relpos():
+	g = level(2)
+	reference, d = DiamondDiagram.decompose(g), DiamondDiagram.assemble(g)
+	reference.assemble()
+	assert same_assembly(reference, d)
+
+	relpos = position_array(d.upper_graph, "relpos")
+	relpos[0] += 0.5
+	d.upper_graph.vp.relpos.set_2d_array(relpos.T)
+	assert not same_assembly(reference, d)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip("graph_tool")
+
+import graph_tool.all
+import numpy as np
+
+from markov_curves import MarkovSequence, layout
+from markov_curves.diagrams import DiamondDiagram
+
+def random_layout(g, pos = None, **options):
+	pos = g.new_vertex_property("vector<double>")
+	pos.set_2d_array(np.random.RandomState(0).rand(2, g.num_vertices()))
+	return pos
+
+def test_warm_layouts_passes_step(monkeypatch):
+	monkeypatch.setattr(graph_tool.all, "sfdp_layout", random_layout)
+	steps = []
+	def refine(g, positions, tol, chunk, max_iter, step, **options):
+		steps.append(step)
+		return positions, {}
+	monkeypatch.setattr(layout, "sfdp_refine", refine)
+	for i, g, positions, stats in layout.warm_layouts(MarkovSequence(DiamondDiagram, 3), step=0.37):
+		pass
+	assert steps == [0.37, 0.37, 0.37]
+
+def test_sfdp_refine_starts_at_step_times_K(monkeypatch):
+	calls = []
+	def sfdp_layout(g, pos = None, **options):
+		calls.append(options)
+		return pos
+	monkeypatch.setattr(graph_tool.all, "sfdp_layout", sfdp_layout)
+	for i, g in MarkovSequence(DiamondDiagram, 2):
+		pass
+	positions = np.random.RandomState(0).rand(g.num_vertices(), 2)
+	layout.sfdp_refine(g, positions, chunk=5, step=0.37)
+	K = layout.mean_edge_length(positions, g.get_edges()[:, :2])
+	assert calls[0]["K"] == pytest.approx(K)
+	assert calls[0]["init_step"] == pytest.approx(0.37 * K)
+	assert not calls[0]["adaptive_cooling"]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip("graph_tool")
+
+import numpy as np
+
+from markov_curves import lod, render
+
+EDGES = [[0, 1], [1, 2], [2, 0]]
+POS = np.array([[0.0, 0.0], [1.0, 0.0], [0.5, 1.0]])
+
+def test_lod_job_is_drawn_without_a_graph(monkeypatch, tmpdir):
+	def no_graph(*args, **options):
+		raise AssertionError("Graph built for a lod job")
+	drawn = []
+	def draw_lod(edges, pos, output, **options):
+		drawn.append((np.asarray(edges), pos))
+		return output
+	monkeypatch.setattr(render, "Graph", no_graph)
+	monkeypatch.setattr(lod, "draw_lod", draw_lod)
+
+	job = render.array_job(3, EDGES, POS, str(tmpdir.join("g.png")), output_size=(32, 32))
+	job["renderer"] = "lod"
+	assert render.render_job(job) == job["output"]
+	assert np.array_equal(drawn[0][0], EDGES) and np.array_equal(drawn[0][1], POS)
+
+def test_lod_job_writes_png(tmpdir):
+	pytest.importorskip("cairo")
+	job = render.array_job(3, EDGES, POS, str(tmpdir.join("g.png")), output_size=(32, 32))
+	job["renderer"] = "lod"
+	render.render_job(job)
+	with open(job["output"], "rb") as f:
+		assert f.read(8) == b"\x89PNG\r\n\x1a\n"